@@ -1,10 +1,70 @@
-from flask import Flask, render_template, request, session
+import json
+import os
+import secrets
 
-from real_estate_calculator import RentalPropertyCalculator
-from real_estate_agent import *
+from flask import Flask, Response, jsonify, render_template, request, session, stream_with_context
+
+from chat_session import ChatSessionRegistry
+from instrumentation import instrument_flask_app, render_prometheus, timed
+from market_benchmarks import MarketBenchmarkIndex
+from real_estate_calculator import METRIC_KEYS, RentalPropertyCalculator
+from real_estate_agent import format_input_value, get_validation_message, parse_numeric_input, property_data_sample, set_model
+from session_store import session_interface_from_env
 
 app = Flask(__name__)
 app.secret_key = "your_secret_key"  # Set a secret key for session management
+# Session data stays on the server (SESSION_BACKEND=memory|sqlite); the cookie only holds its id
+app.session_interface = session_interface_from_env(os.environ)
+# The form shows rates as percentages, the way they are typed in
+app.jinja_env.globals['format_input_value'] = format_input_value
+
+# Request counters and latency histograms for /metrics (METRICS_ENABLED=1); with PROFILE_REQUESTS=1,
+# appending ?profile=1 to a URL returns a cProfile report of that request instead of the page
+instrument_flask_app(app, profile_requests=bool(os.getenv("PROFILE_REQUESTS")))
+
+# Regional market averages (CSV or Parquet); loaded on the first comparison, national defaults without it
+market_index = MarketBenchmarkIndex(os.environ["MARKET_BENCHMARKS_PATH"]) if os.getenv("MARKET_BENCHMARKS_PATH") else None
+
+# Serve answers from a local streaming fake instead of Gemini (offline development and tests)
+if os.getenv("AGENT_FAKE_MODEL"):
+    from fake_gemini import FakeGenerativeModel
+    set_model(FakeGenerativeModel())
+
+# Conversations live in this process, keyed by a chat id kept in the session: the property is sent to the
+# model once and later questions only carry the fields that changed
+chat_sessions = ChatSessionRegistry()
+
+
+def current_chat():
+    if "chat_id" not in session:
+        session["chat_id"] = secrets.token_urlsafe(16)
+    return chat_sessions.get(session["chat_id"])
+
+
+def sse_event(data, event=None):
+    """Formats one Server-Sent Event; data is JSON-encoded so newlines survive."""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+
+@timed('form_parse_seconds')
+def parse_property_form(form, property_data):
+    """Copies the submitted form fields into property_data; returns an error message if any are missing or invalid.
+
+    Fields accept the same input as the CLI ("$2,800", "2.8k", "5%"); rates are stored as fractions.
+    """
+    values = {}
+    for key in property_data_sample:
+        try:
+            input_value = form[key.replace('_', ' ')]
+        except KeyError:
+            return "Missing property data. Please fill in all fields."
+        try:
+            values[key] = parse_numeric_input(input_value, key)
+        except ValueError as e:
+            return f"Invalid {key.replace('_', ' ')}: {e}. {get_validation_message(key)}"
+    property_data.update(values)
+    return None
 
 
 @app.route("/", methods=["GET", "POST"])
@@ -12,30 +72,32 @@ def index():
     if "property_data" not in session:
         session["property_data"] = property_data_sample.copy()
     property_data = session["property_data"]
-    property_calculator = RentalPropertyCalculator()
+    property_calculator = RentalPropertyCalculator(market_index)
 
     if request.method == "POST":
         if "user_query" in request.form:
             user_query = request.form["user_query"]
-            response = generate_agent_response(user_query, property_data)
+            response = current_chat().ask(user_query, property_data)
             return render_template("index.html", user_query=user_query, agent_response=response, property_data=property_data, show_results=True)
 
         elif "reset_form" in request.form:
             session.pop("property_data", None)
+            if "chat_id" in session:
+                chat_sessions.discard(session.pop("chat_id"))
             return render_template("index.html", property_data=property_data_sample.copy())
 
         else:  # Collect property data
-            for key in property_data_sample:
-                try:
-                    input_value = request.form[key.replace('_', ' ')]
-                    try:
-                        property_data[key] = float(input_value)
-                    except ValueError:
-                        property_data[key] = input_value
-                except KeyError:
-                    return "Missing property data. Please fill in all fields."
-
-            property_calculator.calculate_metrics(property_data)
+            previous = dict(property_data)
+            error = parse_property_form(request.form, property_data)
+            if error:
+                return error
+
+            # Editing an analyzed property only recomputes the metrics downstream of the changed fields
+            if all(key in previous for key in METRIC_KEYS):
+                changed_keys = [key for key in property_data_sample if property_data[key] != previous.get(key)]
+                property_calculator.update_metrics(property_data, changed_keys)
+            else:
+                property_calculator.calculate_metrics(property_data)
             session["property_data"] = property_data
 
             results = property_calculator.display_results(property_data)
@@ -47,5 +109,52 @@ def index():
 
     return render_template("index.html", property_data=sorted_property_data)
 
+
+@app.route("/stream", methods=["GET", "POST"])
+def stream():
+    """Streams the agent's answer to `user_query` as Server-Sent Events."""
+    user_query = request.values.get("user_query", "")
+    property_data = session.get("property_data", property_data_sample.copy())
+    chat = current_chat()
+
+    def events():
+        try:
+            for chunk in chat.stream(user_query, property_data):
+                yield sse_event(chunk)
+        except Exception as e:
+            yield sse_event(str(e), event="error")
+            return
+        yield sse_event("", event="done")
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/api/analyze", methods=["POST"])
+def api_analyze():
+    """Analyzes one property given as a JSON object with the property_data_sample keys."""
+    from batch_analysis import analyze_records
+
+    record = request.get_json(silent=True)
+    if not isinstance(record, dict):
+        return jsonify({'ok': False, 'error': "request body must be a JSON object"}), 400
+    result = analyze_records([record], RentalPropertyCalculator(market_index))[0]
+    return jsonify(result), (200 if result['ok'] else 400)
+
+
+@app.route("/api/analyze/batch", methods=["POST"])
+def api_analyze_batch():
+    """Analyzes an NDJSON upload (one property per line), streaming NDJSON results per chunk."""
+    from batch_analysis import analyze_ndjson_lines
+
+    return Response(stream_with_context(analyze_ndjson_lines(request.stream, calculator=RentalPropertyCalculator(market_index))), mimetype="application/x-ndjson")
+
+
+@app.route("/metrics")
+def metrics():
+    """Counters and latency histograms in the Prometheus text format."""
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,82 @@
+# ASGI serving mode: the routes of app.py on Quart (Flask's async twin), so slow
+# Gemini calls are awaited instead of pinning a worker for their whole duration.
+# Run with an ASGI server, e.g. `hypercorn async_app:app`.
+import asyncio
+
+from quart import Quart, Response, render_template, request, session
+
+from app import market_index, parse_property_form, sse_event
+from real_estate_calculator import RentalPropertyCalculator
+from real_estate_agent import (format_input_value, generate_agent_response_async, property_data_sample,
+                               stream_agent_response_async)
+
+app = Quart(__name__)
+app.secret_key = "your_secret_key"  # Set a secret key for session management
+app.jinja_env.globals['format_input_value'] = format_input_value
+
+
+@app.route("/", methods=["GET", "POST"])
+async def index():
+    if "property_data" not in session:
+        session["property_data"] = property_data_sample.copy()
+    property_data = session["property_data"]
+    property_calculator = RentalPropertyCalculator(market_index)
+
+    if request.method == "POST":
+        form = await request.form
+        if "user_query" in form:
+            user_query = form["user_query"]
+            try:
+                response = await generate_agent_response_async(user_query, property_data)
+            except asyncio.TimeoutError:
+                response = "Sorry, the agent took too long to answer. Please try again."
+            return await render_template("index.html", user_query=user_query, agent_response=response,
+                                         property_data=property_data, show_results=True)
+
+        elif "reset_form" in form:
+            session.pop("property_data", None)
+            return await render_template("index.html", property_data=property_data_sample.copy())
+
+        else:  # Collect property data
+            error = parse_property_form(form, property_data)
+            if error:
+                return error
+
+            property_calculator.calculate_metrics(property_data)
+            session["property_data"] = property_data
+
+            results = property_calculator.display_results(property_data)
+            comparisons = property_calculator.compare_with_market(property_data)
+            return await render_template("index.html", property_data=property_data, results=results,
+                                         comparisons=comparisons, show_results=True)
+
+    # Sort property_data before rendering
+    sorted_property_data = dict(sorted(property_data.items(), key=lambda item: item[1] is None, reverse=True))
+
+    return await render_template("index.html", property_data=sorted_property_data)
+
+
+@app.route("/stream", methods=["GET", "POST"])
+async def stream():
+    """Streams the agent's answer to `user_query` as Server-Sent Events."""
+    user_query = request.args.get("user_query") or (await request.form).get("user_query", "")
+    property_data = session.get("property_data", property_data_sample.copy())
+
+    async def events():
+        try:
+            async for chunk in stream_agent_response_async(user_query, property_data):
+                yield sse_event(chunk)
+        except asyncio.TimeoutError:
+            yield sse_event("The agent took too long to answer.", event="error")
+            return
+        except Exception as e:
+            yield sse_event(str(e), event="error")
+            return
+        yield sse_event("", event="done")
+
+    return Response(events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+if __name__ == "__main__":
+    app.run(debug=True)
@@ -1,37 +1,235 @@
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 import os
 
+from instrumentation import describe, increment, observe
+from property_cache import normalize_address
+
 load_dotenv()  # Load variables from .env
 
 api_key = os.getenv("ATTOM_API_KEY")
 
+ATTOM_BASE_URL = "https://api.gateway.attomdata.com/propertyapi/v1.0.0"
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+describe('attom_request_seconds', "ATTOM latency per HTTP attempt")
+describe('attom_requests_total', "ATTOM HTTP attempts by outcome (status code or error type)")
+describe('attom_lookups_total', "ATTOM lookups by source: cache, merged into an in-flight request, or upstream")
+
+
+class RateLimiter:
+    """Thread-safe token bucket allowing `rate` calls per second (None disables it)."""
+
+    def __init__(self, rate=None, burst=1):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
 
 class AttomApi:
+    """ATTOM property API client.
 
-    def get_property_type_api(self, address_street: str, address_city_state: str):
-        url = "https://api.gateway.attomdata.com/propertyapi/v1.0.0/property/detail"
-        # params = {
-        #     "address1": "4529 Winona Court",
-        #     "address2": "Denver, CO"
-        # }
-        params = {
-            "address1": address_street,
-            "address2": address_city_state
-        }
-        headers = {
+    All calls share one pooled requests.Session, carry a timeout, and retry
+    429/5xx responses and connection errors with exponential backoff.
+    `base_url` can point at a local stub server for offline testing.
+
+    With a `cache` (a property_cache.PropertyCache) successful lookups are
+    served from it, and concurrent lookups of the same address share a single
+    upstream request. `offline=True` never calls ATTOM: misses come back as
+    errors.
+    """
+
+    def __init__(self, api_key=None, base_url=ATTOM_BASE_URL, timeout=10, max_retries=4, backoff_base=0.5,
+                 backoff_max=30, pool_size=32, rate_limit=None, cache=None, offline=False):
+        self.api_key = api_key if api_key is not None else os.getenv("ATTOM_API_KEY")
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.cache = cache
+        self.offline = offline
+        self.stats = {'upstream_requests': 0, 'merged_requests': 0}
+
+        # In-flight lookups by normalized address, so duplicates wait instead of refetching
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
             'accept': "application/json",
-            'apikey': api_key  # Make sure 'api_key' is defined somewhere accessible
-        }
+            'apikey': self.api_key or '',
+        })
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _backoff_delay(self, attempt, response=None):
+        """Delay before retry `attempt`, honouring Retry-After when the server sends one."""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after is not None:
+                try:
+                    return min(float(retry_after), self.backoff_max)
+                except ValueError:
+                    pass
+        delay = min(self.backoff_base * (2 ** attempt), self.backoff_max)
+        return delay * random.uniform(0.5, 1.0)
+
+    def get_property_details(self, address1: str, address2: str, rate_limiter=None):
+        """Looks up one address and returns a structured result instead of raising.
+
+        The result is a dict with 'address1', 'address2', 'ok', 'status',
+        'attempts', 'cached', 'data' (parsed JSON on success) and 'error'
+        (message on failure).
+        """
+        if self.cache is not None:
+            data = self.cache.get(address1, address2)
+            if data is not None:
+                increment('attom_lookups_total', source='cache')
+                return {'address1': address1, 'address2': address2, 'ok': True, 'status': None, 'attempts': 0,
+                        'cached': True, 'data': data, 'error': None}
+
+        if self.offline:
+            return {'address1': address1, 'address2': address2, 'ok': False, 'status': None, 'attempts': 0,
+                    'cached': False, 'data': None, 'error': "offline: address not in cache"}
+
+        key = normalize_address(address1, address2)
+        with self._inflight_lock:
+            pending = self._inflight.get(key)
+            leader = pending is None
+            if leader:
+                pending = {'done': threading.Event(), 'result': None}
+                self._inflight[key] = pending
+            else:
+                self.stats['merged_requests'] += 1
+        increment('attom_lookups_total', source='upstream' if leader else 'merged')
+
+        if not leader:
+            pending['done'].wait()
+            return dict(pending['result'], address1=address1, address2=address2)
 
         try:
-            response = requests.get(url, params=params, headers=headers)
-            response.raise_for_status()  # Raise an exception for bad HTTP status codes
+            result = self._fetch(address1, address2, rate_limiter or self.rate_limiter)
+            if result['ok'] and self.cache is not None:
+                self.cache.set(address1, address2, result['data'])
+            pending['result'] = result
+            return result
+        finally:
+            if pending['result'] is None:
+                pending['result'] = {'address1': address1, 'address2': address2, 'ok': False, 'status': None,
+                                     'attempts': 0, 'cached': False, 'data': None, 'error': "lookup failed"}
+            with self._inflight_lock:
+                del self._inflight[key]
+            pending['done'].set()
+
+    def _fetch(self, address1, address2, rate_limiter):
+        """Calls ATTOM with retries and backoff; always returns a structured result."""
+        url = f"{self.base_url}/property/detail"
+        params = {
+            "address1": address1,
+            "address2": address2
+        }
+        result = {'address1': address1, 'address2': address2, 'ok': False, 'status': None, 'attempts': 0,
+                  'cached': False, 'data': None, 'error': None}
+
+        for attempt in range(self.max_retries + 1):
+            rate_limiter.acquire()
+            result['attempts'] = attempt + 1
+            with self._inflight_lock:
+                self.stats['upstream_requests'] += 1
+            response = None
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+                result['status'] = response.status_code
+                observe('attom_request_seconds', time.perf_counter() - started)
+                increment('attom_requests_total', outcome=response.status_code)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    response.raise_for_status()  # Raise an exception for bad HTTP status codes
+                    result['data'] = response.json()
+                    result['ok'] = True
+                    result['error'] = None
+                    return result
+                result['error'] = f"HTTP {response.status_code}"
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                increment('attom_requests_total', outcome=type(e).__name__)
+                result['error'] = f"{type(e).__name__}: {e}"
+            except (requests.exceptions.RequestException, ValueError) as e:
+                # Client errors and unparseable bodies won't get better on retry
+                result['error'] = f"{type(e).__name__}: {e}"
+                return result
+
+            if attempt < self.max_retries:
+                time.sleep(self._backoff_delay(attempt, response))
+
+        return result
 
-            data = response.json()  # Automatically parse the JSON response
-            print(data)  # Or process the data as needed
-            return data
+    def bulk_get_property_details(self, addresses, max_workers=8, rate_limit=None):
+        """Looks up many (address1, address2) pairs concurrently.
 
+        Up to `max_workers` requests are in flight at once; `rate_limit` caps
+        requests per second across all workers (defaults to the client's own
+        limit). Results come back in input order, one structured result per
+        address, with failures reported in place rather than raised.
+        """
+        limiter = RateLimiter(rate_limit) if rate_limit is not None else self.rate_limiter
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda address: self.get_property_details(*address, rate_limiter=limiter),
+                                     addresses))
 
-        except requests.exceptions.RequestException as e:
-            print(f"An error occurred: {e}")
\ No newline at end of file
+    async def get_property_details_async(self, address1: str, address2: str, timeout=None):
+        """Awaitable get_property_details for async servers.
+
+        The blocking lookup runs in a worker thread so the event loop stays free.
+        If it takes longer than `timeout` seconds the caller gets a structured
+        timeout result; the thread itself finishes within the client's own
+        per-attempt timeout and retry budget.
+        """
+        try:
+            return await asyncio.wait_for(asyncio.to_thread(self.get_property_details, address1, address2), timeout)
+        except asyncio.TimeoutError:
+            return {'address1': address1, 'address2': address2, 'ok': False, 'status': None, 'attempts': 0,
+                    'cached': False, 'data': None, 'error': f"timed out after {timeout}s"}
+
+    def get_property_type_api(self, address_street: str, address_city_state: str):
+        result = self.get_property_details(address_street, address_city_state)
+        if not result['ok']:
+            print(f"An error occurred: {result['error']}")
+            return None
+        return result['data']
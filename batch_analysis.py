@@ -0,0 +1,155 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from real_estate_calculator import INPUT_KEYS, METRIC_KEYS, RentalPropertyCalculator
+from market_benchmarks import REGION_LEVELS
+from real_estate_agent import PERCENT_KEYS, property_data_sample
+
+# Records are analyzed this many at a time, so memory stays flat for any upload size
+CHUNK_SIZE = 1000
+
+
+def validate_records(records):
+    """Validates a list of property dicts in bulk.
+
+    Keys follow property_data_sample: fields left out fall back to its
+    defaults, and fields whose default is None are required. Rates are given
+    in percent (0-100) like the form and CLI, and are returned as fractions.
+    Returns (frame, errors): a DataFrame of INPUT_KEYS columns (plus any region
+    fields such as zip_code, used for market comparisons) for the valid
+    records, indexed by their position in `records`, and a dict mapping the
+    position of every invalid record to an error message.
+    """
+    errors = {}
+    objects = []
+    for i, record in enumerate(records):
+        if isinstance(record, dict):
+            objects.append(i)
+        else:
+            errors[i] = "record must be a JSON object"
+
+    frame, frame_errors = validate_frame(pd.DataFrame([records[i] for i in objects], index=objects))
+    errors.update(frame_errors)
+    return frame, errors
+
+
+def validate_frame(raw):
+    """validate_records for a DataFrame with one property per row; errors are keyed by row label."""
+    columns = {}
+    problems = pd.Series('', index=raw.index)
+
+    def flag(mask, message):
+        if mask.any():
+            problems[mask] += message
+
+    for key in INPUT_KEYS:
+        default = property_data_sample.get(key)
+        if key in raw:
+            absent = raw[key].isna()
+            values = pd.to_numeric(raw[key], errors='coerce')
+        else:
+            absent = pd.Series(True, index=raw.index)
+            values = pd.Series(np.nan, index=raw.index)
+
+        flag(~absent & values.isna(), f"{key} must be numeric; ")
+        if key in PERCENT_KEYS:
+            flag((values < 0) | (values > 100), f"{key} must be between 0 and 100%; ")
+            values = values / 100
+        else:
+            flag(values < 0, f"{key} cannot be negative; ")
+
+        # Defaults are already stored in calculator units (rates as fractions)
+        if default is None:
+            flag(absent, f"{key} is required; ")
+        else:
+            values = values.where(~absent, default)
+        columns[key] = values.astype(np.float64)
+    for _, field in REGION_LEVELS:
+        if field in raw:
+            columns[field] = raw[field]
+
+    frame = pd.DataFrame(columns, index=raw.index)
+    bad = problems != ''
+    errors = {i: message.rstrip('; ') for i, message in problems[bad].items()}
+    return frame[~bad.to_numpy()], errors
+
+
+def analyze_records(records, calculator=None):
+    """Validates and analyzes a list of property dicts; returns one result per record, in order.
+
+    Each result is {'ok': True, 'metrics': {...}, 'market': {...}} or
+    {'ok': False, 'error': ...}; an 'id' field on the input record is echoed
+    back. 'market' holds the market averages the property was compared with
+    and the region they came from (see compare_with_market_batch).
+    """
+    calculator = calculator or RentalPropertyCalculator()
+    frame, errors = validate_records(records)
+    calculated = calculator.calculate_metrics_batch(frame)
+    metrics = calculated[METRIC_KEYS]
+    market = calculator.compare_with_market_batch(calculated)
+    average_columns = [column for column in market if column.endswith('_market_average')]
+
+    results = [None] * len(records)
+    for i, row, averages, level, region in zip(metrics.index, metrics.to_dict('records'),
+                                               market[average_columns].to_dict('records'),
+                                               market['region_level'], market['region']):
+        results[i] = {
+            'ok': True,
+            'metrics': {key: _json_number(value) for key, value in row.items()},
+            'market': {
+                'region_level': level,
+                'region': region,
+                'averages': {key[:-len('_market_average')]: _json_number(value) for key, value in averages.items()},
+            },
+        }
+    for i, message in errors.items():
+        results[i] = {'ok': False, 'error': message}
+    for i, record in enumerate(records):
+        if isinstance(record, dict) and 'id' in record:
+            results[i]['id'] = record['id']
+    return results
+
+
+def _json_number(value):
+    # JSON has no inf/NaN; report undefined ratios (e.g. dscr without a mortgage) as null
+    return float(value) if np.isfinite(value) else None
+
+
+def analyze_ndjson_lines(lines, chunk_size=CHUNK_SIZE, calculator=None):
+    """Streams NDJSON results for NDJSON input, one chunk of lines at a time.
+
+    Blank lines are skipped; every other input line yields exactly one output
+    line carrying its 1-based 'line' number, with a per-line error object for
+    malformed JSON or invalid records.
+    """
+    calculator = calculator or RentalPropertyCalculator()
+    chunk = []
+
+    def flush():
+        parsed = []
+        for line_number, text in chunk:
+            try:
+                parsed.append(json.loads(text))
+            except ValueError as e:
+                parsed.append(e)
+        records = [record if not isinstance(record, ValueError) else None for record in parsed]
+        results = analyze_records(records, calculator)
+        for (line_number, _), record, result in zip(chunk, parsed, results):
+            if isinstance(record, ValueError):
+                result = {'ok': False, 'error': f"invalid JSON: {record}"}
+            yield json.dumps({'line': line_number, **result}) + "\n"
+
+    for line_number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        if not line.strip():
+            continue
+        chunk.append((line_number, line))
+        if len(chunk) >= chunk_size:
+            yield from flush()
+            chunk = []
+
+    if chunk:
+        yield from flush()
@@ -0,0 +1,117 @@
+"""Local stand-in for the ATTOM property API.
+
+Serves GET /property/detail?address1=...&address2=... with a deterministic
+payload per address (same shape as ATTOM's, with avm, assessment and sale
+values), after an optional per-request latency. With `fail_every` set,
+every n-th request answers 429 with Retry-After: 0 so the client's retry
+path is exercised too. Point AttomApi(base_url=...) at it:
+
+    python benchmarks/attom_stub.py --port 8765 --latency 0.05
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def property_payload(address1, address2):
+    """The ATTOM-style detail payload for an address; values derive from its hash."""
+    seed = int(hashlib.sha256(f"{address1}|{address2}".upper().encode()).hexdigest()[:8], 16)
+    value = 150000 + seed % 850000
+    return {
+        'status': {'code': 0, 'msg': "SuccessWithResult", 'total': 1},
+        'property': [{
+            'identifier': {'attomId': seed},
+            'address': {'line1': address1, 'line2': address2, 'oneLine': f"{address1}, {address2}"},
+            'summary': {'propType': "SFR", 'yearBuilt': 1950 + seed % 70},
+            'building': {'rooms': {'beds': 1 + seed % 5, 'bathsTotal': 1 + seed % 3}},
+            'avm': {'amount': {'value': value}},
+            'assessment': {'market': {'mktTtlValue': round(value * 0.9)},
+                           'tax': {'taxAmt': round(value * 0.012, 2)}},
+            'sale': {'amount': {'saleAmt': round(value * 0.8)}},
+        }],
+    }
+
+
+class AttomStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, fail_every=0):
+        super().__init__(address, AttomStubHandler)
+        self.latency = latency
+        self.fail_every = fail_every
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class AttomStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real gateway
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, headers=()):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.rstrip('/') != '/property/detail':
+            self._send(404, {'status': {'code': 404, 'msg': "Not found"}})
+            return
+        with self.server.lock:
+            self.server.requests += 1
+            count = self.server.requests
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self.server.fail_every and count % self.server.fail_every == 0:
+            self._send(429, {'status': {'code': 429, 'msg': "Too many requests"}}, [('Retry-After', '0')])
+            return
+        params = parse_qs(url.query)
+        address1 = params.get('address1', [''])[0]
+        address2 = params.get('address2', [''])[0]
+        if not address1 or not address2:
+            self._send(400, {'status': {'code': 400, 'msg': "address1 and address2 are required"}})
+            return
+        self._send(200, property_payload(address1, address2))
+
+
+def start_stub(port=0, latency=0.0, fail_every=0):
+    """Starts the stub in a background thread and returns the server (`.url`, `.shutdown()`)."""
+    server = AttomStubServer(('127.0.0.1', port), latency=latency, fail_every=fail_every)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds slept per request')
+    parser.add_argument('--fail-every', type=int, default=0, help='answer every n-th request with 429')
+    args = parser.parse_args()
+
+    server = AttomStubServer(('127.0.0.1', args.port), latency=args.latency, fail_every=args.fail_every)
+    print(f"ATTOM stub listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
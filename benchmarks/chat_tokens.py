@@ -0,0 +1,86 @@
+"""Prompt-token comparison of stateless answers and chat sessions.
+
+Asks the same scripted conversation about the sample property twice
+against FakeGenerativeModel: once through build_agent_prompt (every turn
+resends the full property_data), once through AgentChatSession (compact
+context once, then only the edited fields). Midway through, the rent is
+edited and the metrics recomputed, like the web form does. Prompt tokens
+are those reported by the fake model's usage metadata.
+
+    python benchmarks/chat_tokens.py --turns 20 --output chat_tokens.json
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chat_session import AgentChatSession  # noqa: E402
+from fake_gemini import FakeGenerativeModel  # noqa: E402
+from real_estate_agent import build_agent_prompt  # noqa: E402
+from real_estate_calculator import RentalPropertyCalculator, property_data_sample  # noqa: E402
+
+QUESTIONS = [
+    "What is the monthly cash flow?",
+    "Is the cap rate good for this area?",
+    "How much could I raise the rent?",
+    "What happens if vacancy doubles?",
+    "Should I refinance?",
+]
+
+
+def run(turns, budget):
+    calculator = RentalPropertyCalculator()
+    property_data = property_data_sample.copy()
+    calculator.calculate_metrics(property_data)
+
+    stateless_model = FakeGenerativeModel(first_token_latency=0, chunk_latency=0)
+    chat_model = FakeGenerativeModel(first_token_latency=0, chunk_latency=0)
+    chat = AgentChatSession(model=chat_model, token_budget=budget)
+
+    rows = []
+    for turn in range(turns):
+        if turn == turns // 2:
+            property_data['monthly_rent'] *= 1.1
+            calculator.update_metrics(property_data, ['monthly_rent'])
+        question = QUESTIONS[turn % len(QUESTIONS)]
+
+        stateless_model.generate_content(build_agent_prompt(question, property_data))
+        summaries = len(chat_model.prompt_tokens)
+        chat.ask(question, property_data)
+        rows.append({
+            'turn': turn + 1,
+            'stateless_prompt_tokens': stateless_model.prompt_tokens[-1],
+            'chat_prompt_tokens': chat_model.prompt_tokens[-1],
+            # A summarization call made before this turn
+            'summary_prompt_tokens': sum(chat_model.prompt_tokens[summaries:-1]),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--turns', type=int, default=20)
+    parser.add_argument('--budget', type=int, help='chat prompt token budget (default: the stateless prompt size)')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    rows = run(args.turns, args.budget)
+    print(f"{'turn':>4} {'stateless':>10} {'chat':>6} {'summary':>8}")
+    for row in rows:
+        print(f"{row['turn']:>4} {row['stateless_prompt_tokens']:>10} {row['chat_prompt_tokens']:>6} "
+              f"{row['summary_prompt_tokens'] or '':>8}")
+
+    stateless = sum(row['stateless_prompt_tokens'] for row in rows)
+    chat = sum(row['chat_prompt_tokens'] + row['summary_prompt_tokens'] for row in rows)
+    print(f"total prompt tokens: stateless {stateless}, chat {chat} ({chat / stateless:.0%})")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'turns': args.turns, 'budget': args.budget, 'rows': rows,
+                       'stateless_total': stateless, 'chat_total': chat}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Incremental recomputation benchmark for single-field edits on large batches.
+
+Builds N random properties as NumPy columns, computes every metric once,
+then for each input field times (a) a full compute_metric_arrays pass and
+(b) RentalPropertyCalculator.update_inputs touching only the dependent
+metrics. After every edit the incremental result is checked against a full
+recompute and the run aborts on any mismatch.
+
+    python benchmarks/incremental.py --count 1000000 --output incremental.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from real_estate_calculator import (INPUT_KEYS, METRIC_KEYS, RentalPropertyCalculator,  # noqa: E402
+                                    affected_metrics, compute_metric_arrays)
+
+
+def random_columns(count, seed=0):
+    rng = np.random.default_rng(seed)
+    columns = {key: rng.uniform(0, 1, count) if key.endswith('_rate') else rng.uniform(0, 5000, count)
+               for key in INPUT_KEYS}
+    # A slice without a mortgage exercises the inf/NaN paths
+    columns['mortgage_monthly_payment'][::50] = 0
+    return columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=1000000)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    calculator = RentalPropertyCalculator()
+    data = random_columns(args.count)
+    data.update(compute_metric_arrays(data))
+    rng = np.random.default_rng(1)
+
+    report = {'count': args.count, 'fields': {}}
+    for key in INPUT_KEYS:
+        edit = data[key] * rng.uniform(0.9, 1.1, args.count)
+
+        started = time.perf_counter()
+        changed = calculator.update_inputs(data, {key: edit})
+        incremental = time.perf_counter() - started
+
+        started = time.perf_counter()
+        expected = compute_metric_arrays(data)
+        full = time.perf_counter() - started
+
+        for metric in METRIC_KEYS:
+            if not np.array_equal(data[metric], expected[metric], equal_nan=True):
+                raise SystemExit(f"mismatch in {metric} after editing {key}")
+
+        report['fields'][key] = {'affected': len(affected_metrics([key])), 'changed': sorted(changed),
+                                 'incremental_s': incremental, 'full_s': full}
+        print(f"{key:<34} {len(affected_metrics([key])):>2}/{len(METRIC_KEYS)} metrics  "
+              f"incremental {incremental * 1000:8.1f} ms  full {full * 1000:8.1f} ms")
+
+    print("all incremental results match a full recompute")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""Load test: sync Flask app vs async Quart app with a stubbed Gemini backend.
+
+Each server runs in its own process with fake_gemini.FakeGenerativeModel
+installed, so no API key or network is needed. The sync path is served by a
+fixed pool of worker threads standing in for gunicorn sync workers; the
+async path is served by hypercorn. For every concurrency level the client
+keeps that many connections posting `user_query` for a fixed duration and
+reports requests/second and latency percentiles.
+
+    python benchmarks/load_test.py --concurrency 50 200 1000 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault("AGENT_FAKE_MODEL", "1")
+
+
+def _install_fake_model(latency):
+    from fake_gemini import FakeGenerativeModel
+    from real_estate_agent import set_model
+    set_model(FakeGenerativeModel(first_token_latency=latency, chunk_latency=0))
+
+
+def serve_sync(port, workers, latency, ready):
+    from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+    from app import app
+    _install_fake_model(latency)
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    class PooledWSGIServer(BaseWSGIServer):
+        # A fixed number of blocking workers, like gunicorn's sync worker class
+        request_queue_size = 4096
+        pool = ThreadPoolExecutor(max_workers=workers)
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self._handle, request, client_address)
+
+        def _handle(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    server = PooledWSGIServer('127.0.0.1', port, app, handler=QuietHandler)
+    ready.set()
+    server.serve_forever()
+
+
+def serve_async(port, latency, ready):
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+    from async_app import app
+    _install_fake_model(latency)
+
+    config = Config()
+    config.bind = [f'127.0.0.1:{port}']
+    config.backlog = 4096
+    config.accesslog = None
+    config.errorlog = None
+    ready.set()
+    asyncio.run(serve(app, config))
+
+
+async def _post(port, body):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write((f"POST / HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n"
+                  f"Content-Type: application/x-www-form-urlencoded\r\nContent-Length: {len(body)}\r\n\r\n").encode()
+                 + body)
+    await writer.drain()
+    status_line = await reader.readline()
+    await reader.read()
+    writer.close()
+    return int(status_line.split()[1])
+
+
+async def run_clients(port, concurrency, duration, timeout):
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + duration
+
+    async def client(client_id):
+        nonlocal errors
+        i = 0
+        while time.monotonic() < deadline:
+            # Unique questions so the response cache never short-circuits the backend
+            body = urlencode({'user_query': f'client {client_id} question {i}'}).encode()
+            started = time.perf_counter()
+            try:
+                status = await asyncio.wait_for(_post(port, body), timeout)
+                if status == 200:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+            except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+                errors += 1
+            i += 1
+
+    started = time.monotonic()
+    await asyncio.gather(*(client(c) for c in range(concurrency)))
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] if latencies else float('nan')
+
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / elapsed,
+        'p50_ms': pct(50) * 1000,
+        'p95_ms': pct(95) * 1000,
+    }
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def benchmark(mode, args):
+    port = _free_port()
+    ready = multiprocessing.Event()
+    if mode == 'sync':
+        server = multiprocessing.Process(target=serve_sync, args=(port, args.sync_workers, args.latency, ready))
+    else:
+        server = multiprocessing.Process(target=serve_async, args=(port, args.latency, ready))
+    server.start()
+    try:
+        ready.wait()
+        time.sleep(0.5)
+        results = []
+        for concurrency in args.concurrency:
+            result = asyncio.run(run_clients(port, concurrency, args.duration, args.timeout))
+            result['mode'] = mode
+            results.append(result)
+            print(f"{mode:>5}  c={concurrency:<5} rps={result['rps']:8.1f}  p50={result['p50_ms']:8.1f}ms  "
+                  f"p95={result['p95_ms']:8.1f}ms  ok={result['requests']:<6} errors={result['errors']}")
+        return results
+    finally:
+        server.terminate()
+        server.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[50, 200, 1000])
+    parser.add_argument('--duration', type=float, default=10, help='seconds per concurrency level')
+    parser.add_argument('--latency', type=float, default=0.5, help='fake Gemini latency in seconds')
+    parser.add_argument('--sync-workers', type=int, default=4, help='worker count for the sync path')
+    parser.add_argument('--llm-concurrency', type=int, default=1000,
+                        help='LLM_CONCURRENCY for the async path (caps in-flight Gemini calls)')
+    parser.add_argument('--timeout', type=float, default=60, help='client-side request timeout')
+    parser.add_argument('--modes', nargs='+', default=['sync', 'async'], choices=['sync', 'async'])
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+    os.environ['LLM_CONCURRENCY'] = str(args.llm_concurrency)
+
+    results = []
+    for mode in args.modes:
+        results.extend(benchmark(mode, args))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
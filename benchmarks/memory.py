@@ -0,0 +1,68 @@
+"""Memory benchmark: bytes per property for each in-memory representation.
+
+Builds N fully calculated properties as plain dicts (what calculate_metrics
+produces today), as PropertyRecords and as one PropertyTable, and reports
+the bytes allocated per property as measured by tracemalloc.
+
+    python benchmarks/memory.py --count 100000 --output memory.json
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from property_record import INPUT_FIELDS, PropertyRecord, PropertyTable  # noqa: E402
+from real_estate_calculator import RentalPropertyCalculator  # noqa: E402
+
+
+def sample_inputs(count, seed=0):
+    """Distinct random properties, so no float objects are shared between them."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield {key: rng.uniform(0, 1) if key.endswith('_rate') else rng.uniform(1, 5000) for key in INPUT_FIELDS}
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    return after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    calculator = RentalPropertyCalculator()
+    inputs = list(sample_inputs(args.count))
+
+    builders = {
+        'dict': lambda: [calculator.calculate_metrics(dict(data)) for data in inputs],
+        'PropertyRecord': lambda: [calculator.calculate_metrics(PropertyRecord(data)) for data in inputs],
+        'PropertyTable': lambda: PropertyTable.from_records(inputs).calculate_metrics(),
+    }
+
+    report = {'count': args.count, 'bytes_per_property': {}}
+    for name, build in builders.items():
+        per_property = measure(build) / args.count
+        report['bytes_per_property'][name] = per_property
+        print(f"{name:<16} {per_property:10.1f} bytes/property")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
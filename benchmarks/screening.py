@@ -0,0 +1,115 @@
+"""Portfolio screening benchmark: top-k queries over a large set of properties.
+
+Loads N random properties into a PropertyPortfolio, then times a set of
+"top k by metric where ..." queries, single-property updates and queries
+right after them (served partly from the pending rows). Every query result
+is checked against a brute-force sort of the same data.
+
+    python benchmarks/screening.py --count 1000000 --output screening.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from portfolio import OPERATORS, PropertyPortfolio  # noqa: E402
+from real_estate_calculator import EXPENSE_KEYS  # noqa: E402
+
+QUERIES = [
+    ('cap_rate', [('dscr', '>', 1.25), ('monthly_cash_flow', '>', 0)]),
+    ('cash_on_cash_return', []),
+    ('annualized_return', [('cap_rate', '>', 9)]),
+    ('noi', [('dscr', '<', 0.5)]),
+    ('monthly_cash_flow', [('property_value', '<', 150000)]),
+]
+
+
+def random_columns(count, seed=0):
+    rng = np.random.default_rng(seed)
+    columns = {key: rng.uniform(0, 400, count) for key in EXPENSE_KEYS}
+    columns.update({
+        'monthly_rent': rng.uniform(800, 6000, count),
+        'additional_monthly_income': rng.uniform(0, 300, count),
+        'vacancy_rate': rng.uniform(0, 0.15, count),
+        'mortgage_monthly_payment': rng.uniform(500, 4000, count),
+        'capex_annual': rng.uniform(0, 3000, count),
+        'tax_rate': rng.uniform(0.1, 0.4, count),
+        'depreciation_anual': rng.uniform(0, 10000, count),
+        'total_investment': rng.uniform(20000, 200000, count),
+        'property_value': rng.uniform(100000, 1000000, count),
+        'appreciation_rate': rng.uniform(0, 0.06, count),
+    })
+    return columns
+
+
+def brute_force(portfolio, k, by, where):
+    data = portfolio.data[:portfolio.size]
+    mask = portfolio._alive[:portfolio.size] & ~np.isnan(data[by])
+    for key, op, value in where:
+        mask &= OPERATORS[op](data[key], value)
+    rows = np.flatnonzero(mask)
+    return rows[np.argsort(-data[by][rows], kind='stable')][:k]
+
+
+def check(portfolio, k, by, where, result):
+    # Compare values rather than ids so ties may come back in either order
+    expected = portfolio.data[by][brute_force(portfolio, k, by, where)]
+    assert np.array_equal(expected, [row[by] for row in result]), (by, where)
+
+
+def time_queries(portfolio, k, repeat):
+    timings = {}
+    for by, where in QUERIES:
+        runs = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = portfolio.top(k, by, where, fields=[by])
+            runs.append(time.perf_counter() - started)
+        check(portfolio, k, by, where, result)
+        timings[f"{by} where {where}"] = statistics.median(runs)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=1000000)
+    parser.add_argument('--k', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--updates', type=int, default=2000, help='single-property updates before re-querying')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    portfolio = PropertyPortfolio()
+    started = time.perf_counter()
+    portfolio.add(random_columns(args.count))
+    report = {'count': args.count, 'k': args.k, 'load_s': time.perf_counter() - started}
+    print(f"load + analyze + index {args.count} properties: {report['load_s']:.2f} s")
+
+    report['query_s'] = time_queries(portfolio, args.k, args.repeat)
+
+    rng = np.random.default_rng(1)
+    started = time.perf_counter()
+    for property_id in rng.integers(0, args.count, args.updates):
+        portfolio.update(property_id, {'monthly_rent': rng.uniform(800, 9000)})
+    report['update_s'] = (time.perf_counter() - started) / args.updates
+    report['query_after_updates_s'] = time_queries(portfolio, args.k, args.repeat)
+
+    for label in ('query_s', 'query_after_updates_s'):
+        print(f"{label}:")
+        for query, seconds in report[label].items():
+            print(f"    {query:<64} {seconds * 1000:8.2f} ms")
+    print(f"update: {report['update_s'] * 1e6:.1f} us/property")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Cold-start benchmark: import-time breakdown and time to first response.
+
+Every measurement runs in a fresh interpreter so nothing is already cached
+in sys.modules. The import breakdown comes from `python -X importtime`;
+time to first response launches a process that imports app.py and serves
+one GET / and one agent query through Flask's test client, with the fake
+Gemini model so no network is involved.
+
+    python benchmarks/startup.py --runs 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+MODULES = ['real_estate_calculator', 'real_estate_agent', 'app']
+
+FIRST_RESPONSE_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import app as web
+imported = time.perf_counter()
+from fake_gemini import FakeGenerativeModel
+web.set_model(FakeGenerativeModel(first_token_latency=0, chunk_latency=0))
+client = web.app.test_client()
+assert client.get('/').status_code == 200
+first_get = time.perf_counter()
+assert client.post('/', data={'user_query': 'Is this a good deal?'}).status_code == 200
+first_query = time.perf_counter()
+print(json.dumps({'import_s': imported - started, 'first_get_s': first_get - imported,
+                  'first_query_s': first_query - first_get}))
+"""
+
+
+def import_breakdown(module, top=8):
+    """Returns the total import time of `module` and its slowest direct imports, in seconds."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    # importtime lists a module's imports right before the module itself
+    pending = []
+    children = []
+    total = None
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        # Nesting shows as two extra spaces of indentation per level after the single separator space
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        name = name.strip()
+        if depth == 0:
+            if name == module:
+                total = int(cumulative) / 1e6
+                children = pending
+            pending = []
+        elif depth == 1:
+            pending.append((name, int(cumulative) / 1e6))
+    children.sort(key=lambda item: item[1], reverse=True)
+    return total, dict(children[:top])
+
+
+def time_to_first_response():
+    env = dict(os.environ, AGENT_FAKE_MODEL='1')
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', FIRST_RESPONSE_SCRIPT], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - started
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['process_wall_s'] = wall
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters per measurement (median reported)')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    report = {'python': sys.version.split()[0], 'imports': {}, 'first_response': {}}
+    for module in MODULES:
+        runs = [import_breakdown(module) for _ in range(args.runs)]
+        total = statistics.median(run[0] for run in runs)
+        report['imports'][module] = {'total_s': total, 'slowest_direct_imports_s': runs[-1][1]}
+        print(f"import {module:<24} {total * 1000:8.1f} ms")
+        for name, seconds in runs[-1][1].items():
+            print(f"    {name:<28} {seconds * 1000:8.1f} ms")
+
+    runs = [time_to_first_response() for _ in range(args.runs)]
+    for key in runs[0]:
+        report['first_response'][key] = statistics.median(run[key] for run in runs)
+    print("time to first response (median of %d):" % args.runs)
+    for key, seconds in report['first_response'].items():
+        print(f"    {key:<28} {seconds * 1000:8.1f} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,307 @@
+"""Regression benchmark suite, fully offline.
+
+Covers calculate_metrics (scalar and batch), the Flask index route (form
+post, query post and the /stream endpoint), the CLI collection flow and
+AttomApi lookups. Gemini is replaced by fake_gemini.FakeGenerativeModel
+(deterministic replies, configurable latency and streaming) and ATTOM by
+the local stub server in attom_stub.py, so no keys or network are needed.
+
+Every benchmark reports throughput and latency percentiles. Results are
+written as JSON together with the Python version, platform and git
+commit. Passing a previous results file as --baseline flags throughput
+drops and p95 latency increases larger than --tolerance, and the exit
+status is 1 when any benchmark regressed.
+
+    python benchmarks/suite.py --output bench.json
+    python benchmarks/suite.py --baseline bench.json --output bench-new.json
+    python benchmarks/suite.py --only calculator_scalar flask_query_post --llm-latency 0.2
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from unittest import mock
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from attom_stub import start_stub  # noqa: E402
+from fake_gemini import FakeGenerativeModel  # noqa: E402
+from real_estate_agent import set_model  # noqa: E402
+from real_estate_calculator import INPUT_KEYS, RentalPropertyCalculator, property_data_sample  # noqa: E402
+
+FORM = {
+    'monthly rent': '$2,800', 'additional monthly income': '0', 'vacancy rate': '5%',
+    'mortgage monthly payment': '1500', 'property monthly taxes': '250', 'insurance monthly': '150',
+    'hoa fees monthly': '50', 'maintenance monthly': '150', 'property management monthly fees': '0',
+    'utilities monthly': '0', 'advertising monthly': '0', 'other expenses monthly': '0', 'capex annual': '1.2k',
+    'tax rate': '25', 'depreciation anual': '0', 'total investment': '50000', 'property value': '$300k',
+    'appreciation rate': '3%',
+}
+
+QUESTIONS = [
+    "What is the monthly cash flow?",
+    "Is the cap rate good?",
+    "How much could I raise the rent?",
+    "Should I refinance?",
+]
+
+# Answers to the CLI, in prompt order: the missing required values (one in words, which goes through the
+# model), an optional update, one question and exit
+CLI_ANSWERS = [
+    "about two thousand a month",
+    "$1,500",
+    "250",
+    "150",
+    "1.2k",
+    "50000",
+    "$300k",
+    "vacancy_rate: 6%",
+    "What is the monthly cash flow?",
+    "exit",
+]
+
+
+def measure(func, repeat, warmup=1, items=1):
+    """Calls func `warmup` + `repeat` times; throughput counts `items` per call."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return {
+        'runs': repeat,
+        'items_per_run': items,
+        'items_per_s': items * repeat / sum(samples),
+        'mean_ms': statistics.fmean(samples) * 1000,
+        'p50_ms': samples[len(samples) // 2] * 1000,
+        'p95_ms': samples[min(int(len(samples) * 0.95), len(samples) - 1)] * 1000,
+    }
+
+
+def fake_model(args, reply=None):
+    model = FakeGenerativeModel(reply=reply, first_token_latency=args.llm_latency, chunk_latency=args.chunk_latency)
+    set_model(model)
+    return model
+
+
+def bench_calculator_scalar(args):
+    calculator = RentalPropertyCalculator()
+    return measure(lambda: calculator.calculate_metrics(dict(property_data_sample)), args.repeat * 100)
+
+
+def bench_calculator_batch(args):
+    calculator = RentalPropertyCalculator()
+    rng = np.random.default_rng(0)
+    columns = {key: rng.uniform(0, 1, args.batch_size) if key.endswith('_rate') else rng.uniform(0, 5000, args.batch_size)
+               for key in INPUT_KEYS}
+    return measure(lambda: calculator.calculate_metrics_batch(columns), max(args.repeat // 10, 5), items=args.batch_size)
+
+
+def _web_client(args):
+    import app as web
+
+    fake_model(args)
+    client = web.app.test_client()
+    assert client.post('/', data=FORM).status_code == 200
+    return client
+
+
+def bench_flask_form_post(args):
+    client = _web_client(args)
+    return measure(lambda: client.post('/', data=FORM), args.repeat)
+
+
+def bench_flask_query_post(args):
+    client = _web_client(args)
+    questions = iter(range(10 ** 9))
+
+    def ask():
+        response = client.post('/', data={'user_query': QUESTIONS[next(questions) % len(QUESTIONS)]})
+        assert response.status_code == 200
+
+    return measure(ask, args.repeat)
+
+
+def bench_flask_stream(args):
+    client = _web_client(args)
+    first_chunks = []
+
+    def stream():
+        started = time.perf_counter()
+        response = client.get('/stream', query_string={'user_query': "Is the cap rate good?"}, buffered=False)
+        chunks = iter(response.response)
+        next(chunks)
+        first_chunks.append(time.perf_counter() - started)
+        for _ in chunks:
+            pass
+        response.close()
+
+    result = measure(stream, args.repeat)
+    first_chunks = sorted(first_chunks[1:])  # without the warmup call
+    result['first_chunk_p50_ms'] = first_chunks[len(first_chunks) // 2] * 1000
+    return result
+
+
+def bench_cli_collect(args):
+    import real_estate_agent
+
+    # Free-text answers are read by the model, which answers with just the value
+    fake_model(args, reply="2000")
+
+    def session():
+        answers = iter(CLI_ANSWERS)
+        with mock.patch('builtins.input', lambda prompt='': next(answers)):
+            real_estate_agent.interact_with_real_estate_agent()
+        assert next(answers, None) is None
+
+    return measure(session, args.repeat)
+
+
+def _attom_client(args, stub, **kwargs):
+    from attom_api import AttomApi
+
+    return AttomApi(api_key='benchmark', base_url=stub.url, backoff_base=0.001, backoff_max=0.01, **kwargs)
+
+
+def _addresses(count, offset=0):
+    return [(f"{offset + i} Main St", "Springfield, IL") for i in range(count)]
+
+
+def bench_attom_lookup(args, stub):
+    addresses = iter(_addresses(10 ** 6))
+    with _attom_client(args, stub) as attom:
+        def lookup():
+            assert attom.get_property_details(*next(addresses))['ok']
+        return measure(lookup, args.repeat)
+
+
+def bench_attom_bulk(args, stub):
+    batches = iter(range(10 ** 6))
+    with _attom_client(args, stub) as attom:
+        def bulk():
+            results = attom.bulk_get_property_details(_addresses(args.attom_bulk, next(batches) * args.attom_bulk))
+            assert all(result['ok'] for result in results)
+        return measure(bulk, max(args.repeat // 10, 3), items=args.attom_bulk)
+
+
+def bench_attom_cached_lookup(args, stub):
+    from property_cache import PropertyCache
+
+    addresses = _addresses(1000)
+    with _attom_client(args, stub, cache=PropertyCache(path=None)) as attom:
+        attom.bulk_get_property_details(addresses)
+        positions = iter(range(10 ** 9))
+
+        def lookup():
+            assert attom.get_property_details(*addresses[next(positions) % len(addresses)])['cached']
+        return measure(lookup, args.repeat * 10)
+
+
+BENCHMARKS = {
+    'calculator_scalar': bench_calculator_scalar,
+    'calculator_batch': bench_calculator_batch,
+    'flask_form_post': bench_flask_form_post,
+    'flask_query_post': bench_flask_query_post,
+    'flask_stream': bench_flask_stream,
+    'cli_collect': bench_cli_collect,
+    'attom_lookup': bench_attom_lookup,
+    'attom_bulk': bench_attom_bulk,
+    'attom_cached_lookup': bench_attom_cached_lookup,
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Benchmarks whose throughput dropped or p95 latency rose by more than `tolerance` (a fraction)."""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result['items_per_s'] < before['items_per_s'] * (1 - tolerance):
+            regressions.append(f"{name}: {before['items_per_s']:.1f} -> {result['items_per_s']:.1f} items/s")
+        if result['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']:.3f} -> {result['p95_ms']:.3f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help='run only these benchmarks')
+    parser.add_argument('--repeat', type=int, default=200, help='timed calls per benchmark (scaled for fast ones)')
+    parser.add_argument('--batch-size', type=int, default=100000, help='properties per calculate_metrics_batch call')
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='fake Gemini latency to the first chunk (s)')
+    parser.add_argument('--chunk-latency', type=float, default=0.0, help='fake Gemini latency between chunks (s)')
+    parser.add_argument('--attom-latency', type=float, default=0.0, help='stub ATTOM latency per request (s)')
+    parser.add_argument('--attom-fail-every', type=int, default=0, help='stub ATTOM answers every n-th request with 429')
+    parser.add_argument('--attom-bulk', type=int, default=200, help='addresses per bulk lookup')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='results file of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression (default 20%%)')
+    args = parser.parse_args()
+
+    stub = start_stub(latency=args.attom_latency, fail_every=args.attom_fail_every)
+    results = {}
+    try:
+        for name in args.only or BENCHMARKS:
+            bench = BENCHMARKS[name]
+            # The routes and the CLI print their results; keep them out of the report
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = bench(args, stub) if name.startswith('attom_') else bench(args)
+            results[name] = result
+            print(f"{name:<22} {result['items_per_s']:>12.1f} items/s   p50 {result['p50_ms']:9.3f} ms"
+                  f"   p95 {result['p95_ms']:9.3f} ms")
+    finally:
+        stub.shutdown()
+
+    report = {
+        'meta': {
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'options': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        options = report['meta']['options']
+        for key, value in baseline['meta']['options'].items():
+            if key not in ('only', 'tolerance') and options.get(key) != value:
+                print(f"warning: baseline ran with {key}={value}, this run with {key}={options.get(key)}")
+        regressions = compare(results, baseline['results'], args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            raise SystemExit(1)
+        print(f"no regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
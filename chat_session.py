@@ -0,0 +1,264 @@
+import threading
+import time
+from collections import OrderedDict
+
+from instrumentation import increment, observe
+from real_estate_agent import (ResponseCache, build_agent_prompt, format_input_value, format_number, get_model,
+                               response_cache)
+from real_estate_calculator import INPUT_KEYS
+
+# Derived metrics worth showing the model; the rest can be worked out from these
+CONTEXT_METRICS = [
+    'total_monthly_expenses',
+    'monthly_cash_flow',
+    'noi',
+    'after_tax_cash_flow',
+    'cap_rate',
+    'dscr',
+    'cash_on_cash_return',
+    'annualized_return',
+]
+CONTEXT_FIELDS = INPUT_KEYS + ['capex_annual'] + CONTEXT_METRICS
+
+# Metrics that calculate_metrics already expresses in percent
+_PERCENT_METRICS = ['cap_rate', 'cash_on_cash_return', 'annualized_return']
+
+CHAT_INSTRUCTIONS = ("You are a helpful real estate agent answering questions about one rental property. "
+                     "Use the property data whenever relevant and keep answers clear and concise. If a question "
+                     "is not about real estate or the property, politely say you can't help with it.")
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token) for models that don't report usage."""
+    return max(1, len(text) // 4)
+
+
+def compact_context(property_data):
+    """The relevant fields of property_data as {field: formatted value}.
+
+    Missing and zero values are left out; rates are shown in percent.
+    """
+    context = {}
+    for key in CONTEXT_FIELDS:
+        value = property_data.get(key)
+        if value is None or value == 0 or value != value:  # value != value skips NaN
+            continue
+        if key in _PERCENT_METRICS:
+            context[key] = f"{format_number(value)}%"
+        else:
+            context[key] = format_input_value(key, value)
+    return context
+
+
+def format_context(context):
+    return ', '.join(f"{key}={value}" for key, value in context.items())
+
+
+def _estimate_contents(contents):
+    return sum(estimate_tokens(part) for message in contents for part in message['parts'])
+
+
+def _prompt_tokens(response, contents):
+    usage = getattr(response, 'usage_metadata', None)
+    reported = getattr(usage, 'prompt_token_count', None)
+    if reported:
+        return reported
+    return _estimate_contents(contents)
+
+
+def _trim(text, words):
+    """The first `words` words of text, marked as cut when anything was left out."""
+    parts = text.split()
+    return text if len(parts) <= words else ' '.join(parts[:words]) + ' ...'
+
+
+class AgentChatSession:
+    """Multi-turn conversation about one property.
+
+    The property is sent once, as a compact list of its relevant fields
+    pinned at the start of the history. Later turns add only the fields that
+    changed since the model last saw them. Only the last `keep_turns`
+    answers are sent in full; older ones are cut to `trim_words` words.
+
+    No prompt is meant to cost more than answering statelessly would:
+    `token_budget` defaults to the estimated size of build_agent_prompt for
+    the same question. When a prompt would exceed it, the conversation so far
+    is summarized by the model (folding all of it at once leaves room for
+    several turns before the next summary), and the pinned context is
+    refreshed with the current fields and the summary.
+
+    The first question of a conversation has no context to depend on, so it
+    is answered from response_cache when the same question about the same
+    data was answered before, and its answer is cached. `turns` records
+    the prompt tokens of every request (reported by the model when it can,
+    estimated otherwise; 0 for cache hits).
+    """
+
+    def __init__(self, model=None, token_budget=None, keep_turns=1, trim_words=25, summary_words=50,
+                 use_cache=True):
+        self.model = model
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self.trim_words = trim_words
+        self.summary_words = summary_words
+        self.use_cache = use_cache
+        self.summary = None
+        self.history = []  # alternating {'role': 'user' | 'model', 'parts': [text]} messages, answers in full
+        self.sent_context = None  # {field: value} as the model currently knows it
+        self.pinned = None
+        self.turns = []
+
+    def _model(self):
+        return self.model if self.model is not None else get_model()
+
+    def _pin(self, context):
+        text = f"{CHAT_INSTRUCTIONS}\nProperty (monthly $ unless noted; fields not listed are 0): {format_context(context)}"
+        if self.summary:
+            text += f"\nConversation so far: {self.summary}"
+        return [{'role': 'user', 'parts': [text]}, {'role': 'model', 'parts': ["Understood."]}]
+
+    def _delta(self, context):
+        changes = [f"{key}={value}" for key, value in context.items() if self.sent_context.get(key) != value]
+        changes += [f"{key}=0" for key in self.sent_context if key not in context]
+        return f"Property updated: {', '.join(changes)}\n" if changes else ""
+
+    def _history_contents(self, keep_turns):
+        """The history as sent: answers before the last keep_turns exchanges are trimmed."""
+        recent = len(self.history) - 2 * keep_turns
+        return [{'role': message['role'], 'parts': [_trim(message['parts'][0], self.trim_words)]}
+                if message['role'] == 'model' and i < recent else message
+                for i, message in enumerate(self.history)]
+
+    def _summarize(self, context):
+        """Folds the history (answers trimmed) into the running summary and re-pins `context` with it.
+
+        The history is only replaced once the summary has come back, so a
+        failed call leaves the conversation as it was.
+        """
+        old = self._history_contents(0)
+        transcript = '\n'.join(f"{message['role']}: {message['parts'][0]}" for message in old)
+        if self.summary:
+            transcript = f"Earlier summary: {self.summary}\n{transcript}"
+        prompt = (f"Summarize this conversation about a rental property in at most {self.summary_words} words. "
+                  f"Keep the figures and conclusions.\n\n{transcript}")
+        response = self._model().generate_content(prompt)
+        self.summary = response.text.strip()
+        self.history = []
+        self.pinned = self._pin(context)
+        self.sent_context = dict(context)
+        prompt_tokens = _prompt_tokens(response, [{'parts': [prompt]}])
+        self.turns.append({'kind': 'summary', 'prompt_tokens': prompt_tokens})
+        increment('llm_prompt_tokens_total', prompt_tokens, mode='chat_summary')
+
+    def _prepare(self, user_query, property_data):
+        """(contents to send, pending turn); the session itself only changes when a summary is folded in."""
+        context = compact_context(property_data)
+        if self.pinned is None:
+            pinned, delta = self._pin(context), ""
+        else:
+            pinned, delta = self.pinned, self._delta(context)
+        message = {'role': 'user', 'parts': [f"{delta}Question: {user_query}"]}
+        contents = pinned + self._history_contents(self.keep_turns) + [message]
+
+        budget = self.token_budget
+        if budget is None:
+            budget = estimate_tokens(build_agent_prompt(user_query, property_data))
+        if self.history and _estimate_contents(contents) > budget:
+            # The pinned context now carries the current fields, so the edits don't need repeating
+            self._summarize(context)
+            pinned = self.pinned
+            message = {'role': 'user', 'parts': [f"Question: {user_query}"]}
+            contents = pinned + [message]
+        return contents, {'message': message, 'pinned': pinned, 'context': context}
+
+    def _cached(self, user_query, property_data):
+        """(cache key, cached answer) for a question that starts a conversation, else (None, None)."""
+        if not self.use_cache or self.history or self.summary:
+            return None, None
+        key = ResponseCache.make_key(user_query, property_data)
+        return key, response_cache.get(key)
+
+    def _record(self, pending, answer, prompt_tokens, kind):
+        """Commits an answered turn; until then the model has not seen its message, edits included."""
+        self.pinned = pending['pinned']
+        self.sent_context = dict(pending['context'])
+        self.history += [pending['message'], {'role': 'model', 'parts': [answer]}]
+        self.turns.append({'kind': kind, 'prompt_tokens': prompt_tokens})
+        increment('llm_prompt_tokens_total', prompt_tokens, mode='chat')
+
+    def ask(self, user_query, property_data):
+        """Answers one question about property_data (its current state, edits included)."""
+        cache_key, cached = self._cached(user_query, property_data)
+        first = self.pinned is None
+        contents, pending = self._prepare(user_query, property_data)
+        if cached is not None:
+            self._record(pending, cached, 0, 'cached')
+            return cached
+
+        started = time.perf_counter()
+        response = self._model().generate_content(contents)
+        answer = response.text
+        observe('llm_request_seconds', time.perf_counter() - started, mode='chat')
+        self._record(pending, answer, _prompt_tokens(response, contents), 'context' if first else 'turn')
+        if cache_key is not None:
+            response_cache.set(cache_key, answer, time.perf_counter() - started)
+        return answer
+
+    def stream(self, user_query, property_data):
+        """Like ask, yielding the answer chunk by chunk (a cached answer in one piece)."""
+        cache_key, cached = self._cached(user_query, property_data)
+        first = self.pinned is None
+        contents, pending = self._prepare(user_query, property_data)
+        if cached is not None:
+            self._record(pending, cached, 0, 'cached')
+            yield cached
+            return
+
+        started = time.perf_counter()
+        parts = []
+        chunk = None
+        for chunk in self._model().generate_content(contents, stream=True):
+            if chunk.text:
+                if not parts:
+                    observe('llm_first_chunk_seconds', time.perf_counter() - started, mode='chat_stream')
+                parts.append(chunk.text)
+                yield chunk.text
+        observe('llm_request_seconds', time.perf_counter() - started, mode='chat_stream')
+        answer = ''.join(parts)
+        self._record(pending, answer, _prompt_tokens(chunk, contents), 'context' if first else 'turn')
+        if cache_key is not None:
+            response_cache.set(cache_key, answer, time.perf_counter() - started)
+
+    def reset(self):
+        self.summary = None
+        self.history = []
+        self.sent_context = None
+        self.pinned = None
+
+
+class ChatSessionRegistry:
+    """In-process LRU of chat sessions by id, with a time-to-live since last use."""
+
+    def __init__(self, max_sessions=10000, ttl=24 * 3600, factory=AgentChatSession):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.factory = factory
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, chat_id):
+        """The session for chat_id, created on first use."""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.sessions.get(chat_id)
+            if entry is None or now - entry[0] > self.ttl:
+                entry = (now, self.factory())
+            self.sessions[chat_id] = (now, entry[1])
+            self.sessions.move_to_end(chat_id)
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+            return entry[1]
+
+    def discard(self, chat_id):
+        with self.lock:
+            self.sessions.pop(chat_id, None)
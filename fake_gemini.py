@@ -0,0 +1,110 @@
+import asyncio
+import hashlib
+import re
+import time
+
+
+class FakeUsage:
+    """Mimics `usage_metadata` of a Gemini response."""
+
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class FakeResponse:
+    """Mimics the `.text` and `.usage_metadata` attributes of a Gemini response or streamed chunk."""
+
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+def prompt_text(contents):
+    """Flattens a prompt string or a list of chat messages ({'role', 'parts'}) into one string."""
+    if isinstance(contents, str):
+        return contents
+    texts = []
+    for message in contents:
+        parts = message.get('parts', []) if isinstance(message, dict) else [message]
+        texts.extend(str(part) for part in parts)
+    return '\n'.join(texts)
+
+
+def count_tokens(text):
+    """Deterministic stand-in for a tokenizer: words, runs of up to three digits and punctuation marks."""
+    return len(re.findall(r"[^\W\d_]+|\d{1,3}|[^\w\s]|_", text))
+
+
+class FakeGenerativeModel:
+    """Offline stand-in for genai.GenerativeModel.
+
+    Replies are deterministic for a given prompt. `first_token_latency` is
+    slept before the first chunk and `chunk_latency` before each following
+    one, so streaming and non-streaming timing can be exercised locally.
+    Prompts may be strings or chat message lists, and responses report
+    token usage the way Gemini does. `prompt_tokens` keeps the prompt token
+    count of every call.
+    """
+
+    def __init__(self, reply=None, words_per_chunk=3, first_token_latency=0.2, chunk_latency=0.05,
+                 model_name="fake-gemini"):
+        self.reply = reply
+        self.words_per_chunk = words_per_chunk
+        self.first_token_latency = first_token_latency
+        self.chunk_latency = chunk_latency
+        self.model_name = model_name
+        self.calls = 0
+        self.prompt_tokens = []
+
+    def _reply_for(self, prompt):
+        if self.reply is not None:
+            return self.reply
+        digest = hashlib.sha256(prompt_text(prompt).encode()).hexdigest()[:8]
+        return (f"Based on the property details you shared, here is my take ({digest}): the numbers "
+                f"look reasonable, but check the cash flow, cap rate and DSCR against your goals "
+                f"before making an offer.")
+
+    def _chunks(self, text):
+        words = text.split(' ')
+        for i in range(0, len(words), self.words_per_chunk):
+            chunk = ' '.join(words[i:i + self.words_per_chunk])
+            yield chunk if i + self.words_per_chunk >= len(words) else chunk + ' '
+
+    def _usage(self, prompt, text):
+        usage = FakeUsage(count_tokens(prompt_text(prompt)), count_tokens(text))
+        self.prompt_tokens.append(usage.prompt_token_count)
+        return usage
+
+    def _stream(self, text, usage):
+        for i, chunk in enumerate(self._chunks(text)):
+            time.sleep(self.first_token_latency if i == 0 else self.chunk_latency)
+            yield FakeResponse(chunk, usage)
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.calls += 1
+        text = self._reply_for(prompt)
+        usage = self._usage(prompt, text)
+        if stream:
+            return self._stream(text, usage)
+        time.sleep(self._total_latency(text))
+        return FakeResponse(text, usage)
+
+    def _total_latency(self, text):
+        chunks = list(self._chunks(text))
+        return self.first_token_latency + self.chunk_latency * max(len(chunks) - 1, 0)
+
+    async def _stream_async(self, text, usage):
+        for i, chunk in enumerate(self._chunks(text)):
+            await asyncio.sleep(self.first_token_latency if i == 0 else self.chunk_latency)
+            yield FakeResponse(chunk, usage)
+
+    async def generate_content_async(self, prompt, stream=False, **kwargs):
+        self.calls += 1
+        text = self._reply_for(prompt)
+        usage = self._usage(prompt, text)
+        if stream:
+            return self._stream_async(text, usage)
+        await asyncio.sleep(self._total_latency(text))
+        return FakeResponse(text, usage)
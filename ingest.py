@@ -0,0 +1,339 @@
+"""Bulk listing ingestion: CSV/Parquet listings in, analyzed Parquet parts out.
+
+Listings are streamed in chunks and their columns are mapped onto the
+property_data_sample schema. Missing property values and taxes can be filled
+in from ATTOM, using concurrent, cached lookups. Each chunk is validated,
+analyzed and written as its own Parquet part by a process pool. At most a
+few chunks are in memory at once, whatever the input size. Progress is
+recorded in a manifest, so an interrupted run resumes after its last
+completed chunk.
+
+    python ingest.py listings.csv analyzed/ --chunk-size 50000 --workers 4 --attom
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from batch_analysis import validate_frame
+from market_benchmarks import REGION_LEVELS
+from real_estate_agent import property_data_sample
+from real_estate_calculator import RentalPropertyCalculator
+
+MANIFEST_NAME = '_manifest.json'
+
+# Common listing column names (lower case, underscores) and the schema field they hold
+COLUMN_ALIASES = {
+    'rent': 'monthly_rent',
+    'monthly_rent_estimate': 'monthly_rent',
+    'rent_estimate': 'monthly_rent',
+    'price': 'property_value',
+    'list_price': 'property_value',
+    'listing_price': 'property_value',
+    'sale_price': 'property_value',
+    'value': 'property_value',
+    'mortgage': 'mortgage_monthly_payment',
+    'mortgage_payment': 'mortgage_monthly_payment',
+    'taxes': 'property_monthly_taxes',
+    'monthly_taxes': 'property_monthly_taxes',
+    'insurance': 'insurance_monthly',
+    'hoa': 'hoa_fees_monthly',
+    'hoa_fee': 'hoa_fees_monthly',
+    'hoa_monthly': 'hoa_fees_monthly',
+    'maintenance': 'maintenance_monthly',
+    'down_payment': 'total_investment',
+    'investment': 'total_investment',
+    'address': 'address1',
+    'street': 'address1',
+    'street_address': 'address1',
+    'address_line1': 'address1',
+    'address_line2': 'address2',
+    'city_state': 'address2',
+    'zip': 'zip_code',
+    'zipcode': 'zip_code',
+    'postal_code': 'zip_code',
+}
+
+# Columns kept alongside the schema fields: identifiers, addresses for ATTOM and regions
+PASSTHROUGH_COLUMNS = ['id', 'address1', 'address2'] + [field for _, field in REGION_LEVELS]
+
+# Where ATTOM responses carry fields we can fill: field -> (candidate paths into a property, scale)
+ATTOM_FIELDS = {
+    'property_value': ([('avm', 'amount', 'value'), ('assessment', 'market', 'mktTtlValue'),
+                        ('sale', 'amount', 'saleAmt')], 1),
+    'property_monthly_taxes': ([('assessment', 'tax', 'taxAmt')], 1 / 12),
+}
+
+
+def normalize_column(name):
+    return str(name).strip().lower().replace(' ', '_').replace('-', '_')
+
+
+def build_column_map(columns, mapping=None):
+    """Maps source column names to schema fields: explicit `mapping` first, then exact names, then aliases."""
+    schema = set(property_data_sample) | set(PASSTHROUGH_COLUMNS)
+    mapping = mapping or {}
+    column_map = {}
+    for column in columns:
+        if column in mapping:
+            column_map[column] = mapping[column]
+            continue
+        name = normalize_column(column)
+        target = name if name in schema else COLUMN_ALIASES.get(name)
+        if target is not None and target not in column_map.values():
+            column_map[column] = target
+    return column_map
+
+
+def read_chunks(path, chunk_size, skip_chunks=0, mapping=None):
+    """Yields (chunk index, first row number, mapped DataFrame, seconds spent reading).
+
+    CSV files are parsed `chunk_size` rows at a time, Parquet files one record
+    batch at a time, and only the mapped columns are kept. The first
+    `skip_chunks` chunks aren't parsed at all for CSV; for Parquet, reading is
+    cheap enough to just read and discard them.
+    """
+    if str(path).endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        column_map = build_column_map(parquet.schema_arrow.names, mapping)
+        batches = parquet.iter_batches(batch_size=chunk_size, columns=list(column_map))
+        chunks = (batch.to_pandas() for batch in batches)
+        index = 0
+    else:
+        header = pd.read_csv(path, nrows=0).columns
+        column_map = build_column_map(header, mapping)
+        chunks = pd.read_csv(path, chunksize=chunk_size, usecols=list(column_map), dtype={
+            column: str for column, target in column_map.items() if target in PASSTHROUGH_COLUMNS},
+            skiprows=range(1, skip_chunks * chunk_size + 1))
+        index = skip_chunks
+
+    start = index * chunk_size
+    while True:
+        started = time.perf_counter()
+        chunk = next(chunks, None)
+        if chunk is None:
+            return
+        if chunk.empty:
+            # pandas yields one empty chunk when skiprows reaches past the end of the file
+            continue
+        chunk = chunk.rename(columns=column_map)
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        elapsed = time.perf_counter() - started
+        if index >= skip_chunks:
+            yield index, start, chunk, elapsed
+        index += 1
+        start += len(chunk)
+
+
+def _attom_value(data, paths):
+    for prop in (data or {}).get('property') or []:
+        for path in paths:
+            value = prop
+            for part in path:
+                value = value.get(part) if isinstance(value, dict) else None
+            if value is not None:
+                return value
+    return None
+
+
+def enrich_chunk(chunk, attom, max_workers=8):
+    """Fills missing ATTOM_FIELDS from ATTOM for rows that have an address; returns the lookup count."""
+    if attom is None or 'address1' not in chunk or 'address2' not in chunk:
+        return 0
+    fields = list(ATTOM_FIELDS)
+    for field in fields:
+        if field not in chunk:
+            chunk[field] = np.nan
+    missing = chunk[fields].isna().any(axis=1) & chunk['address1'].notna() & chunk['address2'].notna()
+    if not missing.any():
+        return 0
+
+    rows = chunk.index[missing]
+    results = attom.bulk_get_property_details(list(zip(chunk.loc[rows, 'address1'], chunk.loc[rows, 'address2'])),
+                                              max_workers=max_workers)
+    for field, (paths, scale) in ATTOM_FIELDS.items():
+        found = pd.Series([_attom_value(result['data'], paths) if result['ok'] else None for result in results],
+                          index=rows, dtype=object)
+        found = pd.to_numeric(found, errors='coerce') * scale
+        chunk.loc[rows, field] = chunk.loc[rows, field].where(chunk.loc[rows, field].notna(), found)
+    return len(rows)
+
+
+def analyze_chunk(index, chunk, output_dir, partition_by=None):
+    """Validates, analyzes and writes one chunk (runs in a worker process); returns its stats."""
+    started = time.perf_counter()
+    frame, errors = validate_frame(chunk)
+    frame = RentalPropertyCalculator().calculate_metrics_batch(frame)
+    passthrough = [column for column in PASSTHROUGH_COLUMNS if column in chunk and column not in frame]
+    frame = chunk[passthrough].loc[frame.index].join(frame)
+    frame.insert(0, 'row', frame.index)
+    analyzed = time.perf_counter()
+
+    basename = f'part-{index:05d}'
+    if partition_by:
+        frame.to_parquet(output_dir, index=False, partition_cols=[partition_by],
+                         basename_template=basename + '-{i}.parquet', existing_data_behavior='overwrite_or_ignore')
+    else:
+        _write_atomic(frame, os.path.join(output_dir, basename + '.parquet'))
+    if errors:
+        rejected = pd.DataFrame({'row': list(errors), 'error': list(errors.values())})
+        _write_atomic(rejected, os.path.join(output_dir, '_errors', basename + '.parquet'))
+    written = time.perf_counter()
+
+    return {
+        'chunk': index,
+        'rows': len(chunk),
+        'analyzed': len(frame),
+        'rejected': len(errors),
+        'seconds': {'analyze': analyzed - started, 'write': written - analyzed},
+    }
+
+
+def _write_atomic(frame, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    frame.to_parquet(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+
+
+def load_manifest(output_dir, input_path, chunk_size):
+    """The progress manifest of a previous run into output_dir, or a fresh one."""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    fresh = {'input': os.path.abspath(input_path), 'chunk_size': chunk_size, 'completed': [], 'finished': False,
+             'rows': 0, 'analyzed': 0, 'rejected': 0, 'attom_lookups': 0}
+    if not os.path.exists(path):
+        return fresh
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest['input'] != fresh['input'] or manifest['chunk_size'] != chunk_size:
+        raise ValueError(f"{output_dir} holds a run of {manifest['input']} with chunk size {manifest['chunk_size']}; "
+                         f"use another output directory or the same input and chunk size")
+    return manifest
+
+
+def save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def run_pipeline(input_path, output_dir, chunk_size=50000, workers=None, mapping=None, attom=None,
+                 attom_workers=8, partition_by=None, max_pending=None):
+    """Ingests `input_path` into Parquet parts under `output_dir`; returns the run summary.
+
+    Chunks are read and enriched in this process while earlier chunks are
+    analyzed in the pool; at most `max_pending` chunks (default workers + 1)
+    are in flight, which bounds memory. The manifest is updated in chunk
+    order after each chunk is written, so a rerun skips every chunk up to the
+    last one that completed, and a run that reached the end of the input is
+    marked finished so rerunning it does nothing.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir, input_path, chunk_size)
+    if manifest.get('finished'):
+        print(f"Already ingested: {len(manifest['completed'])} chunks, {manifest['rows']} rows")
+        return dict(manifest, seconds=0.0, rows_this_run=0, rows_per_second=0.0,
+                    stage_seconds={'read': 0.0, 'enrich': 0.0, 'analyze': 0.0, 'write': 0.0},
+                    completed=len(manifest['completed']))
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers + 1
+    skip_chunks = len(manifest['completed'])
+    if skip_chunks:
+        print(f"Resuming after chunk {skip_chunks - 1} ({manifest['rows']} rows already ingested)")
+
+    stages = {'read': 0.0, 'enrich': 0.0, 'analyze': 0.0, 'write': 0.0}
+    rows_this_run = 0
+    started = time.perf_counter()
+
+    def finish(future):
+        nonlocal rows_this_run
+        stats = future.result()
+        for stage, seconds in stats['seconds'].items():
+            stages[stage] += seconds
+        manifest['completed'].append(stats['chunk'])
+        for key in ('rows', 'analyzed', 'rejected'):
+            manifest[key] += stats[key]
+        save_manifest(output_dir, manifest)
+        rows_this_run += stats['rows']
+        elapsed = time.perf_counter() - started
+        print(f"chunk {stats['chunk']:>5}: {stats['analyzed']:>7} analyzed, {stats['rejected']:>6} rejected | "
+              f"{manifest['rows']:>10} rows total | {rows_this_run / elapsed:,.0f} rows/s")
+
+    in_flight = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for index, _, chunk, read_seconds in read_chunks(input_path, chunk_size, skip_chunks, mapping):
+            stages['read'] += read_seconds
+            enrich_started = time.perf_counter()
+            manifest['attom_lookups'] += enrich_chunk(chunk, attom, attom_workers)
+            stages['enrich'] += time.perf_counter() - enrich_started
+
+            in_flight.append(pool.submit(analyze_chunk, index, chunk, output_dir, partition_by))
+            del chunk
+            while len(in_flight) >= max_pending:
+                finish(in_flight.popleft())
+        while in_flight:
+            finish(in_flight.popleft())
+    manifest['finished'] = True
+    save_manifest(output_dir, manifest)
+
+    elapsed = time.perf_counter() - started
+    summary = dict(manifest, seconds=elapsed, rows_this_run=rows_this_run,
+                   rows_per_second=rows_this_run / elapsed if elapsed else 0.0, stage_seconds=stages)
+    summary['completed'] = len(manifest['completed'])
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help='listings as .csv or .parquet')
+    parser.add_argument('output_dir', help='directory for the Parquet parts and the progress manifest')
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    parser.add_argument('--workers', type=int, help='analysis processes (default: CPU count)')
+    parser.add_argument('--mapping', help='JSON file mapping source column names to property_data_sample keys')
+    parser.add_argument('--partition-by', help='write Hive-style partitions by this column, e.g. zip_code')
+    parser.add_argument('--attom', action='store_true', help='fill missing property values and taxes from ATTOM')
+    parser.add_argument('--attom-workers', type=int, default=8, help='concurrent ATTOM lookups')
+    parser.add_argument('--attom-cache', default='attom_cache.sqlite3', help='ATTOM response cache')
+    parser.add_argument('--offline', action='store_true', help='only use cached ATTOM responses')
+    args = parser.parse_args()
+
+    mapping = None
+    if args.mapping:
+        with open(args.mapping) as f:
+            mapping = json.load(f)
+
+    attom = None
+    if args.attom:
+        from attom_api import AttomApi
+        from property_cache import PropertyCache
+        attom = AttomApi(cache=PropertyCache(args.attom_cache), offline=args.offline)
+
+    try:
+        summary = run_pipeline(args.input, args.output_dir, chunk_size=args.chunk_size, workers=args.workers,
+                               mapping=mapping, attom=attom, attom_workers=args.attom_workers,
+                               partition_by=args.partition_by)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(2)
+    finally:
+        if attom is not None:
+            attom.close()
+            attom.cache.close()
+
+    print(f"\nIngested {summary['rows_this_run']} rows in {summary['seconds']:.2f} s "
+          f"({summary['rows_per_second']:,.0f} rows/s); {summary['analyzed']} analyzed, "
+          f"{summary['rejected']} rejected, {summary['attom_lookups']} ATTOM lookups in total")
+    for stage, seconds in summary['stage_seconds'].items():
+        print(f"  - {stage:<8} {seconds:8.2f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+import bisect
+import functools
+import inspect
+import os
+import threading
+import time
+
+# Off unless METRICS_ENABLED is set (or enable() is called); while off, every hook returns right away
+_enabled = os.getenv("METRICS_ENABLED", "").lower() in ("1", "true", "yes")
+
+# Latency buckets in seconds, from sub-millisecond calculations to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_lock = threading.Lock()
+_counters = {}  # name -> {labels: value}
+_histograms = {}  # name -> {labels: [bucket counts..., sum, count]}
+_help = {}
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """Drops every recorded value."""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def describe(name, text):
+    """Sets the HELP line shown for a metric on /metrics."""
+    _help[name] = text
+
+
+def _label_key(labels):
+    # Label values are text on /metrics; storing them as str also keeps int and str values of one label sortable
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def increment(name, value=1, **labels):
+    """Adds `value` to a counter."""
+    if not _enabled:
+        return
+    key = _label_key(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + value
+
+
+def observe(name, seconds, **labels):
+    """Records one latency sample in a histogram."""
+    if not _enabled:
+        return
+    key = _label_key(labels)
+    bucket = bisect.bisect_left(DEFAULT_BUCKETS, seconds)
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        values = series.get(key)
+        if values is None:
+            values = series[key] = [0] * len(DEFAULT_BUCKETS) + [0.0, 0]
+        if bucket < len(DEFAULT_BUCKETS):
+            values[bucket] += 1
+        values[-2] += seconds
+        values[-1] += 1
+
+
+class _Timer:
+    __slots__ = ('name', 'labels', 'started')
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        observe(self.name, time.perf_counter() - self.started, **self.labels)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name, **labels):
+    """Context manager recording the duration of its block in histogram `name`."""
+    if not _enabled:
+        return _NULL_TIMER
+    return _Timer(name, labels)
+
+
+def timed(name, **labels):
+    """Decorator recording every call's duration in histogram `name` (coroutines are awaited).
+
+    When metrics are off at decoration time (i.e. METRICS_ENABLED isn't set
+    when the module is imported) the function is returned unwrapped, so hot
+    paths like calculate_metrics pay nothing; enable() then only affects
+    timer(), observe() and increment().
+    """
+
+    def decorate(func):
+        if not _enabled:
+            return func
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not _enabled:
+                    return await func(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    observe(name, time.perf_counter() - started, **labels)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - started, **labels)
+        return wrapper
+
+    return decorate
+
+
+def snapshot():
+    """Copies of all counters and histograms, e.g. for benchmarks and tests."""
+    with _lock:
+        return ({name: dict(series) for name, series in _counters.items()},
+                {name: {key: list(values) for key, values in series.items()} for name, series in _histograms.items()})
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format."""
+    counters, histograms = snapshot()
+    lines = []
+    for name in sorted(counters):
+        if name in _help:
+            lines.append(f"# HELP {name} {_help[name]}")
+        lines.append(f"# TYPE {name} counter")
+        for labels, value in sorted(counters[name].items()):
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+    for name in sorted(histograms):
+        if name in _help:
+            lines.append(f"# HELP {name} {_help[name]}")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, values in sorted(histograms[name].items()):
+            cumulative = 0
+            for bound, count in zip(DEFAULT_BUCKETS, values):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {values[-1]}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {values[-2]}")
+            lines.append(f"{name}_count{_format_labels(labels)} {values[-1]}")
+    return '\n'.join(lines) + '\n'
+
+
+def profile_report(profiler, sort='cumulative', limit=40):
+    """Text report of the top `limit` entries of a cProfile.Profile."""
+    import io
+    import pstats
+
+    report = io.StringIO()
+    pstats.Stats(profiler, stream=report).sort_stats(sort).print_stats(limit)
+    return report.getvalue()
+
+
+def instrument_flask_app(app, profile_requests=False):
+    """Counts and times every request of a Flask app, per endpoint and status.
+
+    With `profile_requests`, adding `?profile=1` to a URL runs that request
+    under cProfile and answers with the profile report instead of the page.
+    """
+    from flask import Response, g, request
+
+    describe('http_requests_total', "HTTP requests by endpoint, method and status")
+    describe('http_request_seconds', "HTTP request latency by endpoint (until the view returns)")
+
+    @app.before_request
+    def start_request_timer():
+        if profile_requests and request.args.get('profile'):
+            import cProfile
+
+            g._profiler = cProfile.Profile()
+            g._profiler.enable()
+        if _enabled:
+            g._request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            response = Response(profile_report(profiler), mimetype='text/plain')
+
+        started = g.pop('_request_started', None)
+        if started is not None:
+            endpoint = request.endpoint or 'unknown'
+            observe('http_request_seconds', time.perf_counter() - started, endpoint=endpoint)
+            increment('http_requests_total', endpoint=endpoint, method=request.method, status=response.status_code)
+        return response
@@ -0,0 +1,120 @@
+import numpy as np
+
+from instrumentation import timer
+
+# Benchmarked metrics, as columns of the dataset (all in percent)
+BENCHMARK_METRICS = ['cash_on_cash_return', 'cap_rate', 'appreciation_rate', 'annualized_return']
+
+# Region levels from most to least specific, and the property field holding each one
+REGION_LEVELS = [
+    ('zip', 'zip_code'),
+    ('county', 'county'),
+    ('metro', 'metro'),
+    ('state', 'state'),
+]
+
+
+def _normalize_region(values, zip_codes=False):
+    """Upper-cased, stripped region ids; ZIPs read as numbers get their leading zeros back."""
+    import pandas as pd
+
+    values = pd.Series(values, dtype=object)
+    text = values.where(values.notna(), '').astype(str).str.strip().str.upper()
+    text = text.str.replace(r'\.0$', '', regex=True)
+    if zip_codes:
+        text = text.where(text == '', text.str.zfill(5))
+    return text
+
+
+class MarketBenchmarkIndex:
+    """Regional market averages loaded lazily from a CSV or Parquet file.
+
+    The dataset has one row per region with columns `level` (zip, county,
+    metro, state or national), `region` (the id at that level, empty for
+    national) and one column per BENCHMARK_METRICS entry. Nothing is read
+    until the first lookup; Parquet files are memory-mapped. A property is
+    matched on its zip_code, then county, metro and state fields, falling back
+    to the national row and finally to `defaults`. A matched region that
+    lacks a metric (an empty cell) takes it from the national row or
+    `defaults` the same way.
+    """
+
+    def __init__(self, path, defaults=None):
+        self.path = path
+        self.defaults = dict(defaults or {})
+        self._keys = None
+        self._values = None
+
+    def _load(self):
+        if self._keys is not None:
+            return
+        import pandas as pd
+
+        with timer('market_index_load_seconds'):
+            if str(self.path).endswith('.parquet'):
+                frame = pd.read_parquet(self.path, memory_map=True)
+            else:
+                frame = pd.read_csv(self.path, dtype={'level': str, 'region': str})
+
+        levels = frame['level'].astype(str).str.strip().str.lower()
+        regions = _normalize_region(frame['region']).where(levels != 'zip', _normalize_region(frame['region'], True))
+        self._keys = pd.Index(levels + ':' + regions.where(levels != 'national', ''))
+        self._values = frame[BENCHMARK_METRICS].to_numpy(dtype=np.float64)
+
+        national = self._keys.get_indexer(['national:'])[0]
+        if national >= 0:
+            self.defaults.update((key, value) for key, value in zip(BENCHMARK_METRICS, self._values[national].tolist())
+                                 if value == value)  # skip NaN
+
+    def __len__(self):
+        self._load()
+        return len(self._keys)
+
+    def lookup(self, property_data):
+        """Returns (averages dict, matched level, matched region) for one property."""
+        self._load()
+        for level, field in REGION_LEVELS:
+            region = property_data.get(field)
+            if region is None or region == '':
+                continue
+            region = _normalize_region([region], level == 'zip').iloc[0]
+            position = self._keys.get_indexer([f'{level}:{region}'])[0]
+            if position >= 0:
+                averages = {key: value if value == value else self.defaults.get(key, value)  # NaN -> default
+                            for key, value in zip(BENCHMARK_METRICS, self._values[position].tolist())}
+                return averages, level, region
+        return dict(self.defaults), 'national', None
+
+    def lookup_batch(self, properties):
+        """Vectorized lookup for a DataFrame of properties.
+
+        Each region level is resolved with one index join over the whole
+        batch; rows keep the most specific level that matched. Returns a
+        DataFrame aligned with `properties` holding the averages plus
+        `region_level` and `region` columns.
+        """
+        import pandas as pd
+
+        self._load()
+        n = len(properties)
+        positions = np.full(n, -1)
+        matched_level = np.full(n, 'national', dtype=object)
+        matched_region = np.full(n, None, dtype=object)
+
+        for level, field in REGION_LEVELS:
+            if field not in properties:
+                continue
+            regions = _normalize_region(properties[field].to_numpy(), level == 'zip')
+            found = self._keys.get_indexer(level + ':' + regions)
+            take = (positions < 0) & (found >= 0) & (regions != '').to_numpy()
+            positions[take] = found[take]
+            matched_level[take] = level
+            matched_region[take] = regions.to_numpy()[take]
+
+        defaults = np.array([self.defaults.get(key, np.nan) for key in BENCHMARK_METRICS])
+        averages = np.where((positions >= 0)[:, None], self._values[np.maximum(positions, 0)], defaults)
+        averages = np.where(np.isnan(averages), defaults, averages)
+        result = pd.DataFrame(averages, columns=BENCHMARK_METRICS, index=properties.index)
+        result['region_level'] = matched_level
+        result['region'] = matched_region
+        return result
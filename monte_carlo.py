@@ -0,0 +1,181 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from real_estate_calculator import INPUT_KEYS, compute_metric_arrays
+
+# Point estimates that are replaced by a distribution centred on the property's own value.
+#   normal:     {'std': absolute} or {'rel_std': fraction of the point value}
+#   lognormal:  {'sigma': s} -> point * exp(s * Z), median equals the point value
+#   triangular: {'low': offset, 'high': offset} around the point value (mode = point)
+#   uniform:    {'low': offset, 'high': offset} around the point value
+# Every spec may also carry 'min' / 'max' to clip the draws.
+DEFAULT_DISTRIBUTIONS = {
+    'vacancy_rate': {'dist': 'lognormal', 'sigma': 0.5, 'min': 0},
+    'appreciation_rate': {'dist': 'normal', 'rel_std': 0.5},
+    'maintenance_monthly': {'dist': 'lognormal', 'sigma': 0.3, 'min': 0},
+    'capex_annual': {'dist': 'lognormal', 'sigma': 0.5, 'min': 0},
+}
+
+SUMMARY_METRICS = ['cash_on_cash_return', 'annualized_return']
+PERCENTILES = [5, 50, 95]
+
+# The two property_data layouts in the project spell this key differently
+CAPEX_KEYS = ['capex_annual', 'capex_anual']
+
+
+def _capex_column(columns, n_rows):
+    for key in CAPEX_KEYS:
+        if key in columns:
+            return np.asarray(columns[key], dtype=np.float64)
+    return np.zeros(n_rows)
+
+
+def _standard_draws(seed_entropy, row_index, key_index, dist, n):
+    """Draws n standard normals/uniforms from the stream owned by (row, key).
+
+    Giving every property/input pair its own stream keeps results identical no
+    matter how the portfolio is chunked or how many workers run it.
+    """
+    seq = np.random.SeedSequence(seed_entropy, spawn_key=(row_index, key_index))
+    rng = np.random.default_rng(seq)
+    if dist in ('normal', 'lognormal'):
+        return rng, rng.standard_normal(n)
+    return rng, rng.random(n)
+
+
+def _transform(spec, point, base):
+    """Maps standard draws (rows x scenarios) onto the spec, centred on point (rows x 1)."""
+    dist = spec['dist']
+    if dist == 'normal':
+        std = spec['std'] if 'std' in spec else spec['rel_std'] * np.abs(point)
+        values = point + std * base
+    elif dist == 'lognormal':
+        values = point * np.exp(spec['sigma'] * base)
+    elif dist == 'uniform':
+        values = point + spec['low'] + (spec['high'] - spec['low']) * base
+    elif dist == 'triangular':
+        low, high = spec['low'], spec['high']
+        width = high - low
+        split = -low / width
+        values = point + np.where(
+            base < split,
+            low + np.sqrt(base * width * -low),
+            high - np.sqrt((1 - base) * width * high),
+        )
+    else:
+        raise ValueError(f"Unknown distribution '{dist}'")
+    if 'min' in spec or 'max' in spec:
+        values = np.clip(values, spec.get('min', -np.inf), spec.get('max', np.inf))
+    return values
+
+
+def _simulate_chunk(columns, start_row, distributions, n_scenarios, seed_entropy, max_scenarios):
+    """Runs every scenario for one chunk of properties and reduces it to summary statistics."""
+    n_rows = len(columns['monthly_rent'])
+    points = {key: np.asarray(columns[key], dtype=np.float64)[:, None] for key in INPUT_KEYS}
+    points['capex_annual'] = _capex_column(columns, n_rows)[:, None]
+
+    # Keep at most max_scenarios scenario values per intermediate array
+    slice_size = max(1, min(n_scenarios, max_scenarios // max(n_rows, 1)))
+    keys = list(distributions)
+    streams = {}
+    outputs = {metric: np.empty((n_rows, n_scenarios)) for metric in SUMMARY_METRICS}
+    negative = np.zeros(n_rows)
+
+    for lo in range(0, n_scenarios, slice_size):
+        n = min(slice_size, n_scenarios - lo)
+        scenario = dict(points)
+        for key_index, key in enumerate(keys):
+            spec = distributions[key]
+            base = np.empty((n_rows, n))
+            for row in range(n_rows):
+                stream = streams.get((row, key_index))
+                if stream is None:
+                    stream, base[row] = _standard_draws(seed_entropy, start_row + row, key_index, spec['dist'], n)
+                    streams[(row, key_index)] = stream
+                elif spec['dist'] in ('normal', 'lognormal'):
+                    base[row] = stream.standard_normal(n)
+                else:
+                    base[row] = stream.random(n)
+            scenario[key] = _transform(spec, points[key], base)
+
+        # calculate_metrics ignores capex, so only its deviation from the point
+        # estimate is spread over the monthly expenses; at the point estimate the
+        # simulation reproduces calculate_metrics exactly.
+        capex_shock = (scenario['capex_annual'] - points['capex_annual']) / 12
+        scenario['other_expenses_monthly'] = points['other_expenses_monthly'] + capex_shock
+
+        metrics = compute_metric_arrays(scenario)
+        for metric in SUMMARY_METRICS:
+            outputs[metric][:, lo:lo + n] = metrics[metric]
+        negative += (metrics['monthly_cash_flow'] < 0).sum(axis=1)
+
+    summary = {}
+    for metric in SUMMARY_METRICS:
+        for pct, values in zip(PERCENTILES, np.percentile(outputs[metric], PERCENTILES, axis=1)):
+            summary[f'{metric}_p{pct}'] = values
+    summary['prob_negative_cash_flow'] = negative / n_scenarios
+    return start_row, summary
+
+
+class MonteCarloSimulator:
+    """Draws scenarios for uncertain inputs and summarises the resulting metrics.
+
+    Each property is evaluated on an array of n_scenarios draws at once, and a
+    portfolio is split into chunks so that no more than max_scenarios scenario
+    values are held per intermediate array, whatever chunk_size is asked for.
+    Exact percentiles need every scenario of a property at once, so
+    max_scenarios can't be smaller than n_scenarios. Passing the same seed
+    reproduces a run exactly, independent of chunk size and worker count.
+    """
+
+    def __init__(self, distributions=None, n_scenarios=10000, seed=None, max_scenarios=2_000_000):
+        if n_scenarios > max_scenarios:
+            raise ValueError(f"n_scenarios ({n_scenarios}) can't exceed max_scenarios ({max_scenarios})")
+        self.distributions = dict(DEFAULT_DISTRIBUTIONS if distributions is None else distributions)
+        self.n_scenarios = n_scenarios
+        self.max_scenarios = max_scenarios
+        # Keep the entropy actually used so an unseeded run can be replayed
+        self.seed = np.random.SeedSequence(seed).entropy
+
+    def simulate_property(self, property_data: dict):
+        """Returns the P5/P50/P95 and negative cash flow probability for one property."""
+        summary = self.simulate_portfolio(pd.DataFrame([property_data]))
+        return summary.iloc[0].to_dict()
+
+    def simulate_portfolio(self, properties, max_workers=None, chunk_size=None):
+        """Simulates every property in a DataFrame (or list of dicts).
+
+        With max_workers > 1 the chunks are spread across a process pool. A
+        chunk_size above max_scenarios // n_scenarios properties is lowered to
+        that. Returns a DataFrame of summary statistics aligned with the input rows.
+        """
+        if not isinstance(properties, pd.DataFrame):
+            properties = pd.DataFrame(list(properties))
+
+        max_rows = max(1, self.max_scenarios // self.n_scenarios)
+        chunk_size = max_rows if chunk_size is None else min(chunk_size, max_rows)
+
+        columns = {key: properties[key].to_numpy(dtype=np.float64) for key in INPUT_KEYS}
+        columns['capex_annual'] = _capex_column(properties, len(properties))
+
+        jobs = []
+        for start in range(0, len(properties), chunk_size):
+            chunk = {key: values[start:start + chunk_size] for key, values in columns.items()}
+            jobs.append((chunk, start, self.distributions, self.n_scenarios, self.seed, self.max_scenarios))
+
+        if max_workers is not None and max_workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(_simulate_chunk, *zip(*jobs)))
+        else:
+            results = [_simulate_chunk(*job) for job in jobs]
+
+        frames = [pd.DataFrame(summary) for _, summary in sorted(results, key=lambda item: item[0])]
+        if not frames:
+            return pd.DataFrame(columns=[f'{m}_p{p}' for m in SUMMARY_METRICS for p in PERCENTILES] +
+                                        ['prob_negative_cash_flow'], index=properties.index)
+        result = pd.concat(frames, ignore_index=True)
+        result.index = properties.index
+        return result
@@ -0,0 +1,257 @@
+import heapq
+import operator
+
+import numpy as np
+
+from property_record import PROPERTY_DTYPE, PROPERTY_FIELDS, PropertyTable
+from real_estate_calculator import INPUT_KEYS, compute_metric_arrays
+
+# Metrics that get a sorted index by default
+INDEXED_METRICS = ['cap_rate', 'cash_on_cash_return', 'annualized_return', 'dscr', 'monthly_cash_flow', 'noi']
+
+OPERATORS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+
+class PropertyPortfolio:
+    """Analyzed properties with sorted metric indexes for ranking and screening.
+
+    Properties live in one growable PROPERTY_DTYPE array and are identified
+    by their integer row id. Every indexed metric keeps a sorted (values,
+    rows) pair. Adding, updating or removing properties doesn't re-sort
+    anything: changed rows are marked stale in the sorted indexes and kept in
+    a small pending set that queries scan directly, and once that set grows
+    past `merge_fraction` of the portfolio it is merged into the sorted
+    indexes in one linear pass.
+
+    `top(k, by, where)` answers "top k by metric with predicates" by walking
+    the index of `by` from the best end and filtering blocks until k rows
+    match, or, when a predicate on an indexed metric is more selective (or
+    the walk runs long), by filtering that predicate's index range and
+    partitioning it. The pending rows are ranked separately and a heap
+    merges the two.
+    """
+
+    def __init__(self, indexed=INDEXED_METRICS, capacity=1024, merge_fraction=1 / 32, min_merge=4096):
+        self.indexed = list(indexed)
+        self.merge_fraction = merge_fraction
+        self.min_merge = min_merge
+        self.size = 0
+        self.data = np.full(capacity, np.nan, dtype=PROPERTY_DTYPE)
+        self._alive = np.zeros(capacity, dtype=bool)
+        # Rows whose entries in the sorted indexes are outdated (new, changed or removed)
+        self._stale = np.zeros(capacity, dtype=bool)
+        self._stale_count = 0
+        self._sorted = {key: (np.empty(0), np.empty(0, dtype=np.int64)) for key in self.indexed}
+
+    def __len__(self):
+        return int(np.count_nonzero(self._alive[:self.size]))
+
+    def _grow(self, needed):
+        capacity = len(self.data)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        data = np.full(capacity, np.nan, dtype=PROPERTY_DTYPE)
+        data[:self.size] = self.data[:self.size]
+        self.data = data
+        self._alive = np.concatenate([self._alive, np.zeros(capacity - len(self._alive), dtype=bool)])
+        self._stale = np.concatenate([self._stale, np.zeros(capacity - len(self._stale), dtype=bool)])
+
+    def _mark_stale(self, rows):
+        self._stale_count += int(np.count_nonzero(~self._stale[rows]))
+        self._stale[rows] = True
+        if self._stale_count > max(self.min_merge, self.size * self.merge_fraction):
+            self.merge()
+
+    def _recalculate(self, rows):
+        metrics = compute_metric_arrays({key: self.data[key][rows] for key in INPUT_KEYS})
+        for key, values in metrics.items():
+            self.data[key][rows] = values
+
+    def add(self, properties):
+        """Adds and analyzes properties; returns their ids.
+
+        `properties` is a list of property_data dicts or PropertyRecords, a
+        dict of columns, a DataFrame or a PropertyTable, with rates as
+        fractions like calculate_metrics expects.
+        """
+        if isinstance(properties, PropertyTable):
+            table = properties
+        elif isinstance(properties, (list, tuple)):
+            table = PropertyTable.from_records(properties)
+        else:
+            table = PropertyTable.from_columns(properties)
+
+        start = self.size
+        rows = np.arange(start, start + len(table))
+        self._grow(start + len(table))
+        self.data[start:start + len(table)] = table.data
+        self.size += len(table)
+        self._alive[rows] = True
+        self._recalculate(rows)
+        self._mark_stale(rows)
+        return rows
+
+    def update(self, ids, changes):
+        """Applies input changes (key -> scalar or per-id values) to properties and re-analyzes them."""
+        rows = np.atleast_1d(np.asarray(ids, dtype=np.int64))
+        self._check_ids(rows)
+        for key, values in changes.items():
+            if key not in INPUT_KEYS:
+                raise KeyError(f"Unknown input field: '{key}'")
+            self.data[key][rows] = values
+        self._recalculate(rows)
+        self._mark_stale(rows)
+
+    def remove(self, ids):
+        rows = np.atleast_1d(np.asarray(ids, dtype=np.int64))
+        self._check_ids(rows)
+        self._alive[rows] = False
+        self._mark_stale(rows)
+
+    def _check_ids(self, rows):
+        if len(rows) and (rows.min() < 0 or rows.max() >= self.size or not self._alive[rows].all()):
+            raise KeyError("Unknown property id")
+
+    def get(self, property_id):
+        """The property as a dict of its fields (NaN for values that aren't set)."""
+        self._check_ids(np.array([property_id]))
+        return dict(zip(PROPERTY_FIELDS, self.data[property_id].tolist()))
+
+    def merge(self):
+        """Folds the pending rows into the sorted indexes (linear in the portfolio size)."""
+        n = self.size
+        pending = np.flatnonzero(self._stale[:n] & self._alive[:n])
+        for key in self.indexed:
+            values, rows = self._sorted[key]
+            keep = ~self._stale[rows]
+            values, rows = values[keep], rows[keep]
+
+            new_values = self.data[key][pending]
+            new_rows = pending[~np.isnan(new_values)]
+            new_values = new_values[~np.isnan(new_values)]
+            order = np.argsort(new_values, kind='stable')
+            new_values, new_rows = new_values[order], new_rows[order]
+
+            at = np.searchsorted(values, new_values, side='right')
+            self._sorted[key] = (np.insert(values, at, new_values), np.insert(rows, at, new_rows))
+        self._stale[:n] = False
+        self._stale_count = 0
+
+    def _matching(self, rows, predicates):
+        mask = np.ones(len(rows), dtype=bool)
+        for key, compare, value in predicates:
+            mask &= compare(self.data[key][rows], value)
+        return rows[mask]
+
+    def _best(self, rows, by, k, descending):
+        """The k best of `rows` by `by`, best first (NaN never ranks)."""
+        values = self.data[by][rows]
+        rows = rows[~np.isnan(values)]
+        values = values[~np.isnan(values)]
+        if descending:
+            values = -values
+        if len(rows) > k:
+            part = np.argpartition(values, k - 1)[:k]
+            rows, values = rows[part], values[part]
+        return rows[np.argsort(values, kind='stable')]
+
+    def _walk_index(self, by, k, predicates, descending, limit=None):
+        """First k clean, matching rows along the sorted index of `by`, or None after scanning `limit` rows."""
+        rows = self._sorted[by][1]
+        if descending:
+            rows = rows[::-1]
+        found = []
+        needed = k
+        start = 0
+        block = max(1024, 4 * k)
+        while needed > 0 and start < len(rows):
+            if limit is not None and start >= limit:
+                return None
+            chunk = rows[start:start + block]
+            chunk = self._matching(chunk[~self._stale[chunk]], predicates)[:needed]
+            found.append(chunk)
+            needed -= len(chunk)
+            start += block
+            block *= 2
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+    def _narrowest_range(self, predicates):
+        """Rows of the sorted-index range of the most selective indexed predicate, and its selectivity."""
+        best = None
+        selectivity = 1.0
+        for key, compare, value in predicates:
+            if key not in self._sorted or compare in (operator.eq, operator.ne):
+                continue
+            values, rows = self._sorted[key]
+            if not len(values):
+                continue
+            if compare in (operator.gt, operator.ge):
+                lo = np.searchsorted(values, value, side='right' if compare is operator.gt else 'left')
+                candidates = rows[lo:]
+            else:
+                hi = np.searchsorted(values, value, side='left' if compare is operator.lt else 'right')
+                candidates = rows[:hi]
+            selectivity *= len(candidates) / len(values)
+            if best is None or len(candidates) < len(best):
+                best = candidates
+        return best, selectivity
+
+    def top(self, k, by, where=(), descending=True, fields=None):
+        """The k best properties by metric `by` among those matching `where`.
+
+        `where` is a list of (key, operator, value) predicates, e.g.
+        [('dscr', '>', 1.25), ('monthly_cash_flow', '>', 0)], all of which
+        must hold. Returns up to k dicts, best first, each with the property
+        'id' and `fields` (all fields by default).
+        """
+        predicates = []
+        for key, op, value in where:
+            if key not in PROPERTY_DTYPE.names:
+                raise KeyError(f"Unknown property field: '{key}'")
+            predicates.append((key, OPERATORS[op], value))
+        if by not in PROPERTY_DTYPE.names:
+            raise KeyError(f"Unknown property field: '{by}'")
+        if k <= 0:
+            return []
+
+        n = self.size
+        if by in self._sorted:
+            # Walk the ranking index unless filtering the narrowest predicate range looks cheaper; metrics
+            # are often correlated, so a walk that runs past the size of that range switches over too
+            candidates, selectivity = self._narrowest_range(predicates)
+            ranked = None
+            if candidates is None or len(candidates) >= k / max(selectivity, 1e-12):
+                ranked = self._walk_index(by, k, predicates, descending,
+                                          limit=None if candidates is None else len(candidates))
+            if ranked is None:
+                candidates = self._matching(candidates[~self._stale[candidates]], predicates)
+                ranked = self._best(candidates, by, k, descending)
+            pending = np.flatnonzero(self._stale[:n] & self._alive[:n])
+            pending = self._best(self._matching(pending, predicates), by, k, descending)
+
+            # Both lists are already in rank order, so a heap merge of the two heads gives the overall top k
+            column = self.data[by]
+            sign = -1 if descending else 1
+            merged = heapq.merge(((sign * column[row], row) for row in ranked.tolist()),
+                                 ((sign * column[row], row) for row in pending.tolist()))
+            rows = np.array([row for _, row in heapq.nsmallest(k, merged)], dtype=np.int64)
+        else:
+            rows = self._matching(np.flatnonzero(self._alive[:n]), predicates)
+            rows = self._best(rows, by, k, descending)
+
+        fields = list(fields or PROPERTY_FIELDS)
+        return [{'id': row, **dict(zip(fields, values))}
+                for row, values in zip(rows.tolist(), self.data[fields][rows].tolist())]
+
+    def to_table(self):
+        """A PropertyTable copy of the properties that haven't been removed."""
+        return PropertyTable(data=self.data[:self.size][self._alive[:self.size]].copy())
@@ -0,0 +1,226 @@
+import numpy as np
+import pandas as pd
+
+from real_estate_calculator import EXPENSE_KEYS
+
+# Operating expenses projected with expense inflation (the mortgage comes from the loan terms instead)
+OPERATING_EXPENSE_KEYS = [key for key in EXPENSE_KEYS if key != 'mortgage_monthly_payment']
+
+# Per-property projection assumptions; a DataFrame column of the same name overrides the default.
+# Rates are annual fractions, matching how the agent stores vacancy/tax/appreciation rates.
+# A missing loan_amount (no column, no keyword, or NaN) is the financed part of the purchase,
+# property_value - total_investment, so properties without loan terms still carry their debt.
+PROJECTION_DEFAULTS = {
+    'loan_amount': None,
+    'interest_rate': 0.07,
+    'loan_term_years': 30,
+    'rent_growth': 0.03,
+    'expense_inflation': 0.025,
+    'selling_cost_rate': 0.06,
+    'discount_rate': 0.08,
+}
+
+
+def _column(properties, key, default):
+    if key in properties:
+        return np.asarray(properties[key], dtype=np.float64)
+    return np.full(len(properties), default if default is not None else PROJECTION_DEFAULTS[key], dtype=np.float64)
+
+
+def monthly_payment(loan_amount, interest_rate, loan_term_years):
+    """Level monthly payment for fully amortizing loans; works on scalars or arrays."""
+    loan_amount = np.asarray(loan_amount, dtype=np.float64)
+    r = np.asarray(interest_rate, dtype=np.float64) / 12
+    n = np.asarray(loan_term_years, dtype=np.float64) * 12
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payment = np.where(r == 0, loan_amount / n, loan_amount * r / -np.expm1(-n * np.log1p(r)))
+    return np.where(loan_amount == 0, 0.0, payment)
+
+
+def loan_balance(loan_amount, interest_rate, loan_term_years, months_paid):
+    """Outstanding balance after months_paid payments (closed form, broadcasts)."""
+    loan_amount = np.asarray(loan_amount, dtype=np.float64)
+    r = np.asarray(interest_rate, dtype=np.float64) / 12
+    n = np.asarray(loan_term_years, dtype=np.float64) * 12
+    k = np.minimum(np.asarray(months_paid, dtype=np.float64), n)
+    payment = monthly_payment(loan_amount, interest_rate, loan_term_years)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.exp(k * np.log1p(r))
+        balance = np.where(r == 0, loan_amount - payment * k, loan_amount * growth - payment * (growth - 1) / r)
+    return np.maximum(balance, 0.0)
+
+
+def amortization_schedule(loan_amount, interest_rate, loan_term_years):
+    """Month-by-month schedule for a single loan as a DataFrame."""
+    months = np.arange(1, int(round(loan_term_years * 12)) + 1)
+    payment = float(monthly_payment(loan_amount, interest_rate, loan_term_years))
+    opening = loan_balance(loan_amount, interest_rate, loan_term_years, months - 1)
+    interest = opening * interest_rate / 12
+    return pd.DataFrame({
+        'month': months,
+        'payment': payment,
+        'interest': interest,
+        'principal': payment - interest,
+        'balance': loan_balance(loan_amount, interest_rate, loan_term_years, months),
+    })
+
+
+def build_cash_flow_matrix(properties, hold_years, **assumptions):
+    """Builds the properties x months after-tax cash flow matrix in one vectorized pass.
+
+    Column 0 is the initial outlay (-total_investment), columns 1..hold_years*12
+    are monthly cash flows, and the sale proceeds land in the last month.
+    Rents and operating expenses step up once a year. Taxes follow
+    calculate_metrics: (noi - depreciation_anual) * tax_rate.
+    Returns (cash_flows, details) where details holds per-property sale figures.
+    """
+    n_rows = len(properties)
+    col = {key: _column(properties, key, assumptions.get(key)) for key in PROJECTION_DEFAULTS}
+    financed = (np.asarray(properties['property_value'], dtype=np.float64)
+                - np.asarray(properties['total_investment'], dtype=np.float64))
+    col['loan_amount'] = np.where(np.isnan(col['loan_amount']), np.maximum(financed, 0.0), col['loan_amount'])
+    months = hold_years * 12
+
+    # Year index of every month, and compound growth factors per property and year
+    year = np.arange(hold_years, dtype=np.float64)
+    rent_factor = np.exp(np.outer(np.log1p(col['rent_growth']), year))
+    expense_factor = np.exp(np.outer(np.log1p(col['expense_inflation']), year))
+
+    rent = np.asarray(properties['monthly_rent'], dtype=np.float64)[:, None] * rent_factor
+    other_income = np.asarray(properties['additional_monthly_income'], dtype=np.float64)[:, None] * rent_factor
+    vacancy_rate = np.asarray(properties['vacancy_rate'], dtype=np.float64)[:, None]
+    operating = sum(np.asarray(properties[key], dtype=np.float64) for key in OPERATING_EXPENSE_KEYS)
+    operating = operating[:, None] * expense_factor
+
+    effective_income = (rent + other_income) * (1 - vacancy_rate)
+    # Same NOI definition as calculate_metrics (gross rent less operating expenses)
+    noi_monthly = rent - operating
+    depreciation = np.asarray(properties['depreciation_anual'], dtype=np.float64)[:, None]
+    tax_rate = np.asarray(properties['tax_rate'], dtype=np.float64)[:, None]
+    taxes_monthly = (noi_monthly * 12 - depreciation) * tax_rate / 12
+
+    payment = monthly_payment(col['loan_amount'], col['interest_rate'], col['loan_term_years'])
+    month = np.arange(1, months + 1)
+    in_term = month[None, :] <= (col['loan_term_years'] * 12)[:, None]
+
+    cash_flows = np.empty((n_rows, months + 1))
+    cash_flows[:, 0] = -np.asarray(properties['total_investment'], dtype=np.float64)
+    cash_flows[:, 1:] = np.repeat(effective_income - operating - taxes_monthly, 12, axis=1)
+    cash_flows[:, 1:] -= payment[:, None] * in_term
+
+    property_value = np.asarray(properties['property_value'], dtype=np.float64)
+    appreciation = np.asarray(properties['appreciation_rate'], dtype=np.float64)
+    sale_price = property_value * np.exp(hold_years * np.log1p(appreciation))
+    balance = loan_balance(col['loan_amount'], col['interest_rate'], col['loan_term_years'], months)
+    sale_proceeds = sale_price * (1 - col['selling_cost_rate']) - balance
+    cash_flows[:, -1] += sale_proceeds
+
+    details = {
+        'monthly_payment': payment,
+        'loan_balance_at_sale': balance,
+        'principal_paid': col['loan_amount'] - balance,
+        'sale_price': sale_price,
+        'sale_proceeds': sale_proceeds,
+        'equity_at_sale': sale_price - balance,
+        'equity_build_up': (col['loan_amount'] - balance) + (sale_price - property_value),
+        'discount_rate': col['discount_rate'],
+    }
+    return cash_flows, details
+
+
+def npv(cash_flows, periodic_rate):
+    """Net present value of each row of cash_flows at a per-period rate (scalar or per row)."""
+    periods = np.arange(cash_flows.shape[1])
+    rate = np.asarray(periodic_rate, dtype=np.float64).reshape(-1, 1)
+    return (cash_flows * np.exp(-periods * np.log1p(rate))).sum(axis=1)
+
+
+def irr(cash_flows, tol=1e-10, max_iter=100):
+    """Per-period IRR of every row at once.
+
+    Newton steps on the whole batch, falling back to bisection inside a
+    bracket whenever a step leaves it. Rows without a sign change, or that
+    never bracket a root in (-50%, 100%) per period, return NaN.
+    """
+    n_rows, n_periods = cash_flows.shape
+    periods = np.arange(n_periods, dtype=np.float64)
+    lo = np.full(n_rows, -0.5)
+    hi = np.full(n_rows, 1.0)
+    result = np.full(n_rows, np.nan)
+
+    def value_and_slope(rows, r):
+        # Avoid copying the whole matrix while every row is still iterating
+        rows_flows = cash_flows if rows.size == n_rows else cash_flows[rows]
+        with np.errstate(over='ignore', invalid='ignore'):
+            flows = rows_flows * np.exp(-periods * np.log1p(r)[:, None])
+            return flows.sum(axis=1), -(flows @ periods) / (1 + r)
+
+    all_rows = np.arange(n_rows)
+    f_lo, _ = value_and_slope(all_rows, lo)
+    f_hi, _ = value_and_slope(all_rows, hi)
+    active = np.flatnonzero(np.sign(f_lo) != np.sign(f_hi))
+    ascending = f_lo < f_hi
+
+    # Start from the rate that grows the outlay into the undiscounted inflows
+    # over their cash-weighted mean time; Newton then converges in a few steps.
+    inflows = cash_flows[:, 1:].sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_time = (cash_flows[:, 1:] @ periods[1:]) / inflows
+        rate = np.exp(np.log(inflows / -cash_flows[:, 0]) / mean_time) - 1
+    rate = np.where(np.isfinite(rate) & (rate > lo) & (rate < hi), rate, 0.01)
+
+    for _ in range(max_iter):
+        if active.size == 0:
+            break
+        r = rate[active]
+        f, slope = value_and_slope(active, r)
+
+        done = np.abs(f) < tol * np.maximum(1.0, np.abs(cash_flows[active, 0]))
+        result[active[done]] = r[done]
+
+        # Tighten the bracket around the root
+        below = (f < 0) == ascending[active]
+        lo[active] = np.where(below, r, lo[active])
+        hi[active] = np.where(below, hi[active], r)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = r - f / slope
+        outside = ~np.isfinite(step) | (step <= lo[active]) | (step >= hi[active])
+        step = np.where(outside, (lo[active] + hi[active]) / 2, step)
+        converged = done | (np.abs(step - r) < tol)
+        result[active[converged & ~done]] = step[converged & ~done]
+        rate[active] = step
+        active = active[~converged]
+
+    return result
+
+
+def project_hold(properties, hold_years=10, chunk_size=20000, **assumptions):
+    """Projects a hold of hold_years followed by a sale, for every property.
+
+    `properties` is a DataFrame (or list of dicts) with the calculator's input
+    keys; loan terms and growth assumptions come from same-named columns or
+    the keyword arguments (see PROJECTION_DEFAULTS). Without a loan_amount the
+    loan is property_value - total_investment, amortized on interest_rate and
+    loan_term_years; mortgage_monthly_payment itself isn't used. Returns one row per
+    property with the payment, equity build-up, annualized IRR and NPV.
+    Properties are processed chunk_size at a time to bound memory.
+    """
+    if not isinstance(properties, pd.DataFrame):
+        properties = pd.DataFrame(list(properties))
+
+    frames = []
+    for start in range(0, len(properties), chunk_size):
+        chunk = properties.iloc[start:start + chunk_size]
+        cash_flows, details = build_cash_flow_matrix(chunk, hold_years, **assumptions)
+
+        monthly_irr = irr(cash_flows)
+        monthly_discount = np.expm1(np.log1p(details.pop('discount_rate')) / 12)
+        details['total_cash_flow'] = cash_flows[:, 1:].sum(axis=1) - details['sale_proceeds']
+        details['irr'] = np.expm1(12 * np.log1p(monthly_irr))
+        details['npv'] = npv(cash_flows, monthly_discount)
+        frames.append(pd.DataFrame(details, index=chunk.index))
+
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames)
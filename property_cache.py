@@ -0,0 +1,125 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_address(address1: str, address2: str):
+    """Canonical cache key for an address pair: upper case, no punctuation, single spaces."""
+    def clean(part):
+        part = (part or '').upper().replace('.', ' ').replace(',', ' ').replace('#', ' ')
+        return ' '.join(part.split())
+    return f"{clean(address1)}|{clean(address2)}"
+
+
+class PropertyCache:
+    """Two-level TTL cache for ATTOM lookups: an in-process LRU in front of SQLite.
+
+    Entries older than `ttl` seconds are treated as missing. The memory layer
+    holds at most `max_memory_entries`; the SQLite file (optional, pass
+    `path=None` for memory only) holds at most `max_disk_entries`, evicting the
+    least recently used rows. Safe to share between threads.
+    """
+
+    def __init__(self, path='attom_cache.sqlite3', ttl=30 * 24 * 3600, max_memory_entries=10000,
+                 max_disk_entries=1_000_000):
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0}
+
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS attom_cache ("
+                            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS attom_cache_accessed ON attom_cache (accessed)")
+            self.db.commit()
+            self.disk_entries = self.db.execute("SELECT COUNT(*) FROM attom_cache").fetchone()[0]
+
+    def _expired(self, created, now):
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, address1: str, address2: str):
+        """Returns the cached payload or None on a miss."""
+        key = normalize_address(address1, address2)
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                created, value = entry
+                if not self._expired(created, now):
+                    self.memory.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+                    return value
+                del self.memory[key]
+                self.stats['expired'] += 1
+
+            if self.db is not None:
+                row = self.db.execute("SELECT value, created FROM attom_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    if not self._expired(row[1], now):
+                        value = json.loads(row[0])
+                        self.db.execute("UPDATE attom_cache SET accessed = ? WHERE key = ?", (now, key))
+                        self.db.commit()
+                        self._remember(key, row[1], value)
+                        self.stats['disk_hits'] += 1
+                        return value
+                    self.db.execute("DELETE FROM attom_cache WHERE key = ?", (key,))
+                    self.db.commit()
+                    self.disk_entries -= 1
+                    self.stats['expired'] += 1
+
+            self.stats['misses'] += 1
+            return None
+
+    def set(self, address1: str, address2: str, value):
+        key = normalize_address(address1, address2)
+        now = time.time()
+        with self.lock:
+            self._remember(key, now, value)
+            if self.db is not None:
+                exists = self.db.execute("SELECT 1 FROM attom_cache WHERE key = ?", (key,)).fetchone()
+                self.db.execute("INSERT OR REPLACE INTO attom_cache (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                                (key, json.dumps(value), now, now))
+                if exists is None:
+                    self.disk_entries += 1
+                overflow = self.disk_entries - self.max_disk_entries
+                if overflow > 0:
+                    self.db.execute("DELETE FROM attom_cache WHERE key IN "
+                                    "(SELECT key FROM attom_cache ORDER BY accessed LIMIT ?)", (overflow,))
+                    self.disk_entries -= overflow
+                    self.stats['evictions'] += overflow
+                self.db.commit()
+
+    def _remember(self, key, created, value):
+        self.memory[key] = (created, value)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+
+    def purge_expired(self):
+        """Drops expired rows from both layers; returns how many disk rows were removed."""
+        now = time.time()
+        with self.lock:
+            for key in [key for key, (created, _) in self.memory.items() if self._expired(created, now)]:
+                del self.memory[key]
+            if self.db is None or self.ttl is None:
+                return 0
+            removed = self.db.execute("DELETE FROM attom_cache WHERE created < ?", (now - self.ttl,)).rowcount
+            self.db.commit()
+            self.disk_entries -= removed
+            return removed
+
+    def hit_rate(self):
+        hits = self.stats['memory_hits'] + self.stats['disk_hits']
+        total = hits + self.stats['misses']
+        return hits / total if total else 0.0
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
@@ -0,0 +1,225 @@
+from collections.abc import MutableMapping
+
+import numpy as np
+
+from real_estate_calculator import METRIC_KEYS, compute_metric_arrays
+
+# Input fields, in the order of property_data_sample
+INPUT_FIELDS = [
+    'monthly_rent',
+    'additional_monthly_income',
+    'vacancy_rate',
+    'mortgage_monthly_payment',
+    'property_monthly_taxes',
+    'insurance_monthly',
+    'hoa_fees_monthly',
+    'maintenance_monthly',
+    'property_management_monthly_fees',
+    'utilities_monthly',
+    'advertising_monthly',
+    'other_expenses_monthly',
+    'capex_annual',
+    'tax_rate',
+    'depreciation_anual',
+    'total_investment',
+    'property_value',
+    'appreciation_rate',
+]
+
+PROPERTY_FIELDS = INPUT_FIELDS + METRIC_KEYS
+_FIELD_SET = frozenset(PROPERTY_FIELDS)
+
+# Other spellings accepted for a field (the calculator's property_data_sample uses 'capex_anual')
+FIELD_ALIASES = {'capex_anual': 'capex_annual'}
+_ALIASES_BY_FIELD = {}
+for _alias, _field in FIELD_ALIASES.items():
+    _ALIASES_BY_FIELD.setdefault(_field, []).append(_alias)
+
+
+def _lookup(mapping, key):
+    """mapping[key], falling back to the key's aliases; None when absent."""
+    value = mapping.get(key)
+    if value is None:
+        for alias in _ALIASES_BY_FIELD.get(key, ()):
+            value = mapping.get(alias)
+            if value is not None:
+                break
+    return value
+
+# One float64 per field; NaN marks a value that hasn't been provided or computed
+PROPERTY_DTYPE = np.dtype([(name, np.float64) for name in PROPERTY_FIELDS])
+
+
+class PropertyRecord(MutableMapping):
+    """Fixed-field property with the same item access as a property_data dict.
+
+    Values live in __slots__ instead of a per-instance dict, so a record costs a
+    fraction of the equivalent dict. It supports everything calculate_metrics
+    and the agent functions do with a dict (`record[key]`, assignment, `in`,
+    `.items()`, `.copy()`), but only PROPERTY_FIELDS can be set; FIELD_ALIASES
+    name the same slot as their field. A field that was never assigned is
+    absent, like a missing dict key.
+    """
+
+    __slots__ = tuple(PROPERTY_FIELDS)
+
+    def __init__(self, data=None, **fields):
+        if data is not None:
+            for key, value in (data.items() if hasattr(data, 'items') else data):
+                self[key] = value
+        for key, value in fields.items():
+            self[key] = value
+
+    def __getitem__(self, key):
+        key = FIELD_ALIASES.get(key, key)
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        key = FIELD_ALIASES.get(key, key)
+        if key not in _FIELD_SET:
+            raise KeyError(f"Unknown property field: '{key}'")
+        setattr(self, key, value)
+
+    def __delitem__(self, key):
+        key = FIELD_ALIASES.get(key, key)
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        try:
+            delattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __iter__(self):
+        for key in PROPERTY_FIELDS:
+            if hasattr(self, key):
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, key):
+        key = FIELD_ALIASES.get(key, key)
+        return key in _FIELD_SET and hasattr(self, key)
+
+    def __str__(self):
+        # Reads like the dict it replaces, e.g. when embedded in an agent prompt
+        return str(dict(self))
+
+    def __repr__(self):
+        return f"PropertyRecord({dict(self)!r})"
+
+    def __getstate__(self):
+        return dict(self)
+
+    def __setstate__(self, state):
+        self.__init__(state)
+
+    def copy(self):
+        return PropertyRecord(self)
+
+    def to_dict(self):
+        return dict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Builds a record from a property_data dict; unknown keys raise KeyError."""
+        return cls(data)
+
+
+class PropertyTable:
+    """Array-backed collection of properties on a NumPy structured dtype.
+
+    Every property is one row of PROPERTY_DTYPE (one float64 per field, NaN
+    when missing). `table['cap_rate']` is a zero-copy view of a column, so the
+    table can be handed to calculate_metrics, calculate_metrics_batch or
+    anything else that indexes property_data by key; `table[i]` returns a
+    PropertyRecord copy of a single row.
+    """
+
+    def __init__(self, size=0, data=None):
+        if data is None:
+            data = np.full(size, np.nan, dtype=PROPERTY_DTYPE)
+        elif data.dtype != PROPERTY_DTYPE:
+            raise ValueError("PropertyTable data must use PROPERTY_DTYPE")
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return FIELD_ALIASES.get(key, key) in _FIELD_SET
+
+    def keys(self):
+        return list(PROPERTY_FIELDS)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            key = FIELD_ALIASES.get(key, key)
+            if key not in _FIELD_SET:
+                raise KeyError(key)
+            return self.data[key]
+        if isinstance(key, (int, np.integer)):
+            return self.record(key)
+        return PropertyTable(data=self.data[key])
+
+    def __setitem__(self, key, value):
+        key = FIELD_ALIASES.get(key, key)
+        if key not in _FIELD_SET:
+            raise KeyError(f"Unknown property field: '{key}'")
+        self.data[key] = value
+
+    def record(self, index):
+        """The row at `index` as a PropertyRecord, leaving NaN fields unset."""
+        row = self.data[index]
+        return PropertyRecord((key, float(row[key])) for key in PROPERTY_FIELDS if not np.isnan(row[key]))
+
+    def columns(self):
+        """Dict of column views; no data is copied."""
+        return {key: self.data[key] for key in PROPERTY_FIELDS}
+
+    def to_dicts(self):
+        for i in range(len(self.data)):
+            yield self.record(i).to_dict()
+
+    def to_dataframe(self):
+        import pandas as pd
+        return pd.DataFrame(self.data)
+
+    @classmethod
+    def from_records(cls, records):
+        """Builds a table from dicts or PropertyRecords (None and absent fields become NaN)."""
+        records = list(records)
+        table = cls(len(records))
+        for key in PROPERTY_FIELDS:
+            column = table.data[key]
+            for i, record in enumerate(records):
+                value = _lookup(record, key)
+                if value is not None:
+                    column[i] = value
+        return table
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Builds a table from a dict of equal-length columns or a DataFrame."""
+        sources = {}
+        for key in PROPERTY_FIELDS:
+            for name in [key] + _ALIASES_BY_FIELD.get(key, []):
+                if name in columns:
+                    sources[key] = name
+                    break
+        size = len(columns[next(iter(sources.values()))]) if sources else 0
+        table = cls(size)
+        for key, name in sources.items():
+            table.data[key] = np.asarray(columns[name], dtype=np.float64)
+        return table
+
+    def calculate_metrics(self):
+        """Computes the derived metrics for every row in place and returns the table."""
+        for key, values in compute_metric_arrays(self.columns()).items():
+            self.data[key] = values
+        return self
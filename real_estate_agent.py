@@ -1,20 +1,140 @@
-import google.generativeai as genai
+import hashlib
+import json
 import re
-from dotenv import load_dotenv
+import threading
+import time
+import weakref
+from collections import OrderedDict
 import os
 
+from instrumentation import describe, increment, observe, timed
 from real_estate_calculator import RentalPropertyCalculator
 
-# Initialize the Google Gemini API
-load_dotenv()
+MODEL_NAME = "gemini-1.5-pro-latest"
 
-api_key = os.getenv("GEMINI_API_KEY")
-genai.configure(api_key=api_key)
+# Async serving: per-call timeout (seconds) and the cap on concurrent outbound LLM calls
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "64"))
+
+# asyncio semaphores belong to one event loop, so keep one per running loop
+_llm_semaphores = weakref.WeakKeyDictionary()
+
+_model = None
+_model_lock = threading.Lock()
+
+describe('agent_response_seconds', "Time to answer an agent question, cache hits included")
+describe('llm_request_seconds', "Gemini latency per call (streams: until the last chunk)")
+describe('llm_first_chunk_seconds', "Gemini latency until the first streamed chunk")
+describe('agent_cache_lookups_total', "Agent response cache lookups by result")
+
+
+def get_model():
+    """Returns the process-wide Gemini model, creating it on first use.
+
+    google.generativeai is imported and configured here rather than at module
+    import, so code that never talks to Gemini doesn't pay for it.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                import google.generativeai as genai
+                from dotenv import load_dotenv
+
+                # Initialize the Google Gemini API
+                load_dotenv()
+                genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+                _model = genai.GenerativeModel(model_name=MODEL_NAME)
+    return _model
+
+
+def get_llm_semaphore():
+    """Returns the semaphore bounding concurrent LLM calls on the running event loop."""
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    semaphore = _llm_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _llm_semaphores[loop] = asyncio.Semaphore(LLM_CONCURRENCY)
+    return semaphore
+
+
+def set_model(model):
+    """Replaces the process-wide model, e.g. with fake_gemini.FakeGenerativeModel for offline use."""
+    global _model
+    with _model_lock:
+        _model = model
+
+
+class ResponseCache:
+    """Thread-safe LRU cache of agent answers with a time-to-live.
+
+    Keys are a hash of the normalized question and the canonical JSON of the
+    property data, so the same question about identical data is answered once.
+    Each entry remembers how long the model took, which is counted as saved
+    latency whenever the entry is reused.
+    """
+
+    def __init__(self, max_entries=1024, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_latency = 0.0
+
+    @staticmethod
+    def make_key(user_query, property_data):
+        normalized_query = ' '.join(user_query.lower().split())
+        canonical_data = json.dumps(dict(property_data), sort_keys=True, default=str)
+        return hashlib.sha256(f"{normalized_query}\0{canonical_data}".encode()).hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                created, text, latency = entry
+                if time.monotonic() - created <= self.ttl:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    self.saved_latency += latency
+                    increment('agent_cache_lookups_total', result='hit')
+                    return text
+                del self.entries[key]
+            self.misses += 1
+        increment('agent_cache_lookups_total', result='miss')
+        return None
+
+    def set(self, key, text, latency):
+        with self.lock:
+            self.entries[key] = (time.monotonic(), text, latency)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'saved_latency_seconds': self.saved_latency,
+            }
+
+
+response_cache = ResponseCache()
 
 property_data_sample = {
     'monthly_rent': None,
     'additional_monthly_income': 0,  # Added some additional income
-    'vacancy_rate': 5,  # Adjusted vacancy rate
+    'vacancy_rate': 0.05,  # Adjusted vacancy rate (5%)
     'mortgage_monthly_payment': None,
     'property_monthly_taxes': None,  # Adjusted property taxes
     'insurance_monthly': None,  # Adjusted insurance_monthly
@@ -25,13 +145,96 @@ property_data_sample = {
     'advertising_monthly': 0,
     'other_expenses_monthly': 0,  # Added other expenses
     'capex_annual': None,  # Added capex_annual
-    'tax_rate': 25,  # Adjusted tax rate
+    'tax_rate': 0.25,  # Adjusted tax rate (25%)
     'depreciation_anual': 0,
     'total_investment': None,  # Adjusted total investment
     'property_value': None,  # Adjusted property value
-    'appreciation_rate': 3,  # Adjusted appreciation rate
+    'appreciation_rate': 0.03,  # Adjusted appreciation rate (3%)
 }
 
+# Rates are entered as percentages and stored as fractions, which is what the calculator expects
+PERCENT_KEYS = ['vacancy_rate', 'tax_rate', 'appreciation_rate']
+
+# A typed amount: optional sign and $, thousands separators, k/m suffix, % and a per-month/year period
+_NUMBER_PATTERN = re.compile(r"""
+    ^(?P<sign>[-+])?\s*(?:\$|usd\b)?\s*
+    (?P<number>\d{1,3}(?:,\d{3})+(?:\.\d*)?|\d+(?:\.\d*)?|\.\d+)\s*
+    (?P<scale>k|thousand|m|mm|mil|million)?\s*
+    (?:usd|dollars?|bucks)?\s*
+    (?P<percent>%|percent|pct)?\s*
+    (?:(?:/|per|a|an|each)\s*)?(?P<period>mo|mos|month|months|monthly|yr|yrs|year|years|yearly|annual|annually|annum)?
+    \.?\s*$""", re.VERBOSE | re.IGNORECASE)
+
+# Number-like fragments inside free text, e.g. an LLM reply
+_NUMBER_FRAGMENT = re.compile(r"[-+]?\$?\s?\d[\d,]*(?:\.\d+)?(?:\s?(?:k|m|thousand|million)\b)?\s?%?", re.IGNORECASE)
+
+_SCALES = {'k': 1e3, 'thousand': 1e3, 'm': 1e6, 'mm': 1e6, 'mil': 1e6, 'million': 1e6}
+
+
+def input_period(key):
+    """'month' or 'year' for amounts entered per period, None for one-off amounts and rates."""
+    if key in PERCENT_KEYS:
+        return None
+    if key.endswith(('_annual', '_anual')):
+        return 'year'
+    if 'monthly' in key:
+        return 'month'
+    return None
+
+
+def parse_numeric_input(user_input, key):
+    """Parses a typed answer for `key` into the value stored in property_data.
+
+    Understands "$2,800", "2.8k", "1.2m", "5%" and periods such as
+    "$2,800/mo" or "12k per year", converting between monthly and annual
+    amounts as the key requires. Rates are read as percentages and returned
+    as fractions ("5" and "5%" both give 0.05). Raises ValueError with a
+    message for the user when the answer isn't a valid value for the key.
+    """
+    label = key.replace('_', ' ')
+    match = _NUMBER_PATTERN.match(str(user_input).strip())
+    if match is None:
+        raise ValueError(f"'{user_input}' is not a number")
+
+    value = float(match['number'].replace(',', ''))
+    if match['scale']:
+        value *= _SCALES[match['scale'].lower()]
+    if match['sign'] == '-':
+        value = -value
+
+    if key in PERCENT_KEYS:
+        if not 0 <= value <= 100:
+            raise ValueError(f"{label} must be between 0 and 100%")
+        return value / 100
+    if match['percent']:
+        raise ValueError(f"{label} is an amount, not a percentage")
+
+    if match['period']:
+        period = 'month' if match['period'].lower().startswith('mo') else 'year'
+        expected = input_period(key)
+        if expected is None:
+            raise ValueError(f"{label} is a one-off amount, not per {period}")
+        if period != expected:
+            value = value * 12 if expected == 'year' else value / 12
+    if value < 0:
+        raise ValueError(f"{label} cannot be negative")
+    return value
+
+
+def format_input_value(key, value):
+    """The inverse of parse_numeric_input, for showing a stored value to the user."""
+    if value is None:
+        return ''
+    if key in PERCENT_KEYS:
+        return f"{format_number(value * 100)}%"
+    return format_number(value) if isinstance(value, (int, float)) else str(value)
+
+
+def format_number(value, decimals=2):
+    """Plain decimal notation without trailing zeros, e.g. 1200000 or 9.2 (never 1.2e+06)."""
+    text = f"{value:.{decimals}f}"
+    return text.rstrip('0').rstrip('.') if '.' in text else text
+
 
 def identify_missing_keys(property_data):
     """Identifies keys with missing (None) values."""
@@ -42,7 +245,7 @@ def create_prompts(property_data, missing_keys):
     """Creates prompts for required and optional values."""
     required_prompts = [f"Please enter the {key.replace('_', ' ')}:" for key in missing_keys]
     optional_prompts = [
-        f"* {key.replace('_', ' ')}: {value}"
+        f"* {key.replace('_', ' ')}: {format_input_value(key, value)}"
         for key, value in property_data.items() if value is not None
     ]
     return required_prompts, optional_prompts
@@ -52,74 +255,85 @@ def extract_answer_from_response(response_text):
     """
     Extracts the user's numeric answer from the Gemini response text.
     """
+    # The model is asked to reply with just the value, so try the whole reply first
+    text = response_text.strip()
+    if _NUMBER_PATTERN.match(text):
+        return text
 
-    # Use regular expressions to find numeric values in the response
-    numeric_values = re.findall(r"[-+]?\d*\.?\d+", response_text)
-
-    if numeric_values:
-        # If multiple numeric values are found, take the last one
-        # (assuming it's the most likely answer)
-        user_answer = numeric_values[-1]
-    else:
+    numeric_values = [value.strip().rstrip(',') for value in _NUMBER_FRAGMENT.findall(response_text)]
+    if not numeric_values:
         # Handle the case where no numeric value is found
         raise ValueError("No numeric value found in the response. Please provide a numerical answer.")
 
-    return user_answer
+    # If multiple numeric values are found, take the last one (assuming it's the model's conclusion)
+    return numeric_values[-1]
 
 
 def is_valid_numeric_input(user_input, key):
     """Checks if the user input is a valid numeric value for the given key."""
     try:
-        if key in ['vacancy_rate', 'tax_rate', 'appreciation_rate']:
-            value = float(user_input) / 100
-            if not 0 <= value <= 1:
-                return False
-        else:
-            value = float(user_input)
-            if value < 0:
-                return False
+        parse_numeric_input(user_input, key)
         return True
     except ValueError:
         return False
 
 
+def get_validation_message(key):
+    """Re-prompt text for an answer that isn't a valid value for `key`."""
+    label = key.replace('_', ' ')
+    if key in PERCENT_KEYS:
+        return f"Please provide the {label} as a percentage between 0 and 100, e.g. 5 or 5%."
+    period = input_period(key)
+    example = {'month': "1500, $1,500 or $1,500/mo", 'year': "1200, $1.2k or $100/mo"}.get(period, "250000 or $250k")
+    return f"Please provide a valid non-negative amount for {label}, e.g. {example}."
+
+
+def interpret_free_text_answer(user_input, key):
+    """Asks Gemini to pull the value for `key` out of a free-text answer; returns it parsed, or None."""
+    label = key.replace('_', ' ')
+    unit = "as a percentage" if key in PERCENT_KEYS else f"in dollars{' per ' + input_period(key) if input_period(key) else ''}"
+    prompt = (f'A user was asked for the {label} of a rental property and answered: "{user_input}".\n'
+              f"Reply with only that value {unit}, as a plain number, or NONE if the answer doesn't contain one.")
+    increment('input_llm_fallbacks_total', key=key)
+    try:
+        return parse_numeric_input(extract_answer_from_response(get_model().generate_content(prompt).text), key)
+    except ValueError:
+        return None
+
+
 def get_user_input_with_gemini(prompt):
-    """Gets user input via Gemini, handling dialog for numeric validation."""
-    model = genai.GenerativeModel(model_name="gemini-1.5-pro-latest", )
+    """Asks for the value behind `prompt` until the answer is valid; returns it as stored in property_data.
 
+    Answers are parsed locally; Gemini is only consulted for free-text answers
+    the local parser can't read, such as "about twenty-eight hundred".
+    """
+    key = get_corresponding_key(prompt)
     while True:
         print(prompt)
         user_input = input("Your answer: ")
 
-        key = get_corresponding_key(prompt)
-
         # Check if key is None before proceeding
         if key is None:
             print("Invalid input. Please try again.")
             continue  # Go back to the start of the loop
 
-        if is_valid_numeric_input(user_input, key):
-            return user_input
-        else:
-            validation_prompt = f"Please provide a valid numeric value for {key.replace('_', ' ')}."
-            validation_response = model.generate_content(validation_prompt)
-            print(validation_response.text)
+        try:
+            return parse_numeric_input(user_input, key)
+        except ValueError as e:
+            error = e
+
+        # Only words are worth a round-trip; a number that's out of range won't get better
+        if _NUMBER_PATTERN.match(user_input.strip()) is None and re.search(r"[a-z]{2}", user_input, re.IGNORECASE):
+            value = interpret_free_text_answer(user_input, key)
+            if value is not None:
+                print(f"Understood {key.replace('_', ' ')} as {format_input_value(key, value)}.")
+                return value
+        print(f"{error}. {get_validation_message(key)}")
 
 
 def validate_and_convert_input(user_input, key):
     """Validates and converts user input to the appropriate data type."""
-    try:
-        if key in ['vacancy_rate', 'tax_rate', 'appreciation_rate']:
-            value = float(user_input) / 100
-            if not 0 <= value <= 1:
-                raise ValueError(f"{key.replace('_', ' ')} must be between 0 and 100%")
-        else:
-            value = float(user_input)
-            if value < 0:
-                raise ValueError(f"{key.replace('_', ' ')} cannot be negative")
-        return value
-    except ValueError as e:
-        raise e  # Re-raise the ValueError for the outer loop to handle
+    return parse_numeric_input(user_input, key)
 
 
 def get_corresponding_key(prompt):
@@ -164,6 +378,28 @@ def update_property_data(property_data, prompt, user_input):
     property_data[key] = validated_input
 
 
+def apply_user_updates(property_data, text):
+    """Applies 'key: value' updates (several may be separated by commas, semicolons or newlines).
+
+    Returns the error messages of the updates that couldn't be applied.
+    """
+    errors = []
+    # A comma only separates updates when another 'key:' follows, so "$2,800" stays whole
+    for update in re.split(r"[;\n]|,\s*(?=[A-Za-z][A-Za-z_ ]*:)", text):
+        if not update.strip():
+            continue
+        try:
+            key, value = update.split(':', 1)
+            key = key.strip().lower().replace(' ', '_')
+            if key not in property_data:
+                raise ValueError(f"Invalid key: '{key}'. Please check the available options.")
+            property_data[key] = validate_and_convert_input(value.strip(), key)
+            print(f"Updated {key.replace('_', ' ')} to {format_input_value(key, property_data[key])}")
+        except ValueError as e:
+            errors.append(f"Error processing update '{update.strip()}': {e}")
+    return errors
+
+
 def process_user_updates(property_data):
     """Processes user input to update optional values in property_data."""
 
@@ -181,18 +417,8 @@ def process_user_updates(property_data):
                     break  # Exit the inner loop when the user types "done"
 
                 else:
-                    try:
-                        key, value = user_input.split(':')
-                        key = key.strip().replace(' ', '_')
-                        if key not in property_data:
-                            raise ValueError(f"Invalid key: '{key}'. Please check the available options.")
-
-                        validated_input = validate_and_convert_input(value.strip(), key)
-                        property_data[key] = validated_input
-                        print(f"Updated {key.replace('_', ' ')} to {validated_input}")
-
-                    except ValueError as e:
-                        print(f"Error processing update '{user_input}': {e}. Please try again.")
+                    for error in apply_user_updates(property_data, user_input):
+                        print(f"{error}. Please try again.")
 
             break  # Exit the outer loop after updates are done
 
@@ -212,11 +438,7 @@ def collect_property_data_with_gemini(property_data):
     if required_prompts:
         print("Let's start by gathering some essential information about the property.")
         for prompt in required_prompts:
-            try:
-                user_input = get_user_input_with_gemini(prompt)
-                update_property_data(property_data, prompt, user_input)
-            except ValueError as e:  # Catch potential validation errors
-                print(f"Error: {e}. Please try again.")
+            property_data[get_corresponding_key(prompt)] = get_user_input_with_gemini(prompt)
 
     # Present optional values for updates
     if optional_prompts:
@@ -226,20 +448,20 @@ def collect_property_data_with_gemini(property_data):
                            "Would you like to update any of these values?\n"
                            "If yes, please specify which value and its new value in the format 'key: value' (e.g., 'additional_monthly_income: 50').\n"
                            "If not, just say 'no'. \n")
-        if user_input.lower() == 'no':
+        if user_input.strip().lower() in ('', 'no'):
             return property_data
-        for prompt in optional_prompts:
-            try:
-                update_property_data(property_data, prompt, user_input)
-            except Exception as e:  # Catch potential errors during update processing
-                print(f"Error processing updates: {e}. Please try again.")
+        if user_input.strip().lower() == 'yes':
+            process_user_updates(property_data)
+            return property_data
+        for error in apply_user_updates(property_data, user_input):
+            print(f"{error}. Please try again.")
 
     return property_data
 
 
-def generate_agent_response(user_query, property_data):
-    # Construct a prompt that incorporates the user query and relevant property data
-    prompt = f"""
+def build_agent_prompt(user_query, property_data):
+    """Constructs a prompt that incorporates the user query and relevant property data."""
+    return f"""
     You are a helpful real estate agent. 
     A user has asked the following question about a property:
 
@@ -252,12 +474,122 @@ def generate_agent_response(user_query, property_data):
     If the question is not related to real estate or the provided property data, politely indicate that you can't help with that specific query.
     """
 
+
+@timed('agent_response_seconds', mode='sync')
+def generate_agent_response(user_query, property_data, use_cache=True):
+    # Identical questions about identical data are answered from the cache
+    if use_cache:
+        cache_key = ResponseCache.make_key(user_query, property_data)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    prompt = build_agent_prompt(user_query, property_data)
+
     # Generate a response using the Gemini API
-    model = genai.GenerativeModel(model_name="gemini-1.5-pro-latest")
-    response = model.generate_content(prompt)
+    started = time.perf_counter()
+    response = get_model().generate_content(prompt)
+    text = response.text
+    observe('llm_request_seconds', time.perf_counter() - started, mode='sync')
+
+    if use_cache:
+        response_cache.set(cache_key, text, time.perf_counter() - started)
+    return text
+
+
+def stream_agent_response(user_query, property_data, use_cache=True):
+    """Yields the agent's answer chunk by chunk as Gemini streams it.
+
+    A cached answer is yielded in one piece; a streamed answer is cached once
+    it has been received in full.
+    """
+    if use_cache:
+        cache_key = ResponseCache.make_key(user_query, property_data)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+    prompt = build_agent_prompt(user_query, property_data)
+
+    started = time.perf_counter()
+    parts = []
+    for chunk in get_model().generate_content(prompt, stream=True):
+        if chunk.text:
+            if not parts:
+                observe('llm_first_chunk_seconds', time.perf_counter() - started, mode='stream')
+            parts.append(chunk.text)
+            yield chunk.text
+    observe('llm_request_seconds', time.perf_counter() - started, mode='stream')
+
+    if use_cache:
+        response_cache.set(cache_key, ''.join(parts), time.perf_counter() - started)
+
+
+@timed('agent_response_seconds', mode='async')
+async def generate_agent_response_async(user_query, property_data, timeout=None, use_cache=True):
+    """Awaitable generate_agent_response for async servers.
+
+    At most LLM_CONCURRENCY calls are in flight per event loop, and a call that
+    exceeds `timeout` (default LLM_TIMEOUT) is cancelled with asyncio.TimeoutError.
+    Cancelling the awaiting task cancels the outbound call as well.
+    """
+    import asyncio
+
+    if use_cache:
+        cache_key = ResponseCache.make_key(user_query, property_data)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    prompt = build_agent_prompt(user_query, property_data)
 
-    # Extract and return the generated text
-    return response.text
+    async with get_llm_semaphore():
+        started = time.perf_counter()
+        response = await asyncio.wait_for(get_model().generate_content_async(prompt),
+                                          LLM_TIMEOUT if timeout is None else timeout)
+        text = response.text
+        observe('llm_request_seconds', time.perf_counter() - started, mode='async')
+
+    if use_cache:
+        response_cache.set(cache_key, text, time.perf_counter() - started)
+    return text
+
+
+async def stream_agent_response_async(user_query, property_data, timeout=None, use_cache=True):
+    """Async counterpart of stream_agent_response; `timeout` bounds the whole stream."""
+    import asyncio
+
+    if use_cache:
+        cache_key = ResponseCache.make_key(user_query, property_data)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+    prompt = build_agent_prompt(user_query, property_data)
+    deadline = time.monotonic() + (LLM_TIMEOUT if timeout is None else timeout)
+
+    async with get_llm_semaphore():
+        started = time.perf_counter()
+        parts = []
+        response = await asyncio.wait_for(get_model().generate_content_async(prompt, stream=True),
+                                          deadline - time.monotonic())
+        chunks = response.__aiter__()
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), deadline - time.monotonic())
+            except StopAsyncIteration:
+                break
+            if chunk.text:
+                if not parts:
+                    observe('llm_first_chunk_seconds', time.perf_counter() - started, mode='async_stream')
+                parts.append(chunk.text)
+                yield chunk.text
+        observe('llm_request_seconds', time.perf_counter() - started, mode='async_stream')
+
+    if use_cache:
+        response_cache.set(cache_key, ''.join(parts), time.perf_counter() - started)
 
 
 def interact_with_real_estate_agent():
@@ -267,17 +599,22 @@ def interact_with_real_estate_agent():
     property_calculator = RentalPropertyCalculator()
 
     # 1. Collect property data from the user
-    property_data = collect_property_data_with_gemini(property_data_sample)
+    # Work on a copy so the module-level sample stays pristine between sessions
+    property_data = collect_property_data_with_gemini(property_data_sample.copy())
 
     # 2. Perform calculations (if needed)
     property_calculator.calculate_metrics(property_data)
 
     property_calculator.display_results(property_data)
-    property_calculator.compare_with_market(property_data)
+    property_calculator.display_comparison(property_calculator.compare_with_market(property_data))
 
     # 3. Interact with the agent
     print("\nGreat! Now you can ask me questions about the property or real estate in general.")
 
+    # The property is sent once; follow-up questions reuse the conversation
+    from chat_session import AgentChatSession
+    chat = AgentChatSession()
+
     while True:
         user_query = input("You: ")
 
@@ -285,5 +622,6 @@ def interact_with_real_estate_agent():
             print("Agent: Goodbye! Feel free to reach out again if you have any more questions.")
             break
 
-        response = generate_agent_response(user_query, property_data)
-        print("Agent:", response)
\ No newline at end of file
+        response = chat.ask(user_query, property_data)
+        print("Agent:", response)
+        print(f"[{chat.turns[-1]['prompt_tokens']} prompt tokens]")
\ No newline at end of file
@@ -1,11 +1,13 @@
-from attom_api import AttomApi
+import sys
 
-# attom_api = AttomApi()
+import numpy as np
+
+from instrumentation import timed
 
 property_data_sample = {
     'monthly_rent': 2800,
     'additional_monthly_income': 0,  # Added some additional income
-    'vacancy_rate': 5,  # Adjusted vacancy rate
+    'vacancy_rate': 0.05,  # Adjusted vacancy rate (5%)
     'mortgage_monthly_payment': 1500,
     'property_monthly_taxes': 250,  # Adjusted property taxes
     'insurance_monthly': 150,  # Adjusted insurance_monthly
@@ -16,25 +18,174 @@ property_data_sample = {
     'advertising_monthly': 0,
     'other_expenses_monthly': 0,  # Added other expenses
     'capex_anual': 1000,  # Added capex_anual
-    'tax_rate': 25,  # Adjusted tax rate
+    'tax_rate': 0.25,  # Adjusted tax rate (25%)
     'depreciation_anual': 0,
     'total_investment': 50000,  # Adjusted total investment
     'property_value': 300000,  # Adjusted property value
-    'appreciation_rate': 3,  # Adjusted appreciation rate
+    'appreciation_rate': 0.03,  # Adjusted appreciation rate (3%)
+}
+
+# Monthly expense fields summed into total_monthly_expenses
+EXPENSE_KEYS = [
+    'mortgage_monthly_payment',
+    'property_monthly_taxes',
+    'insurance_monthly',
+    'hoa_fees_monthly',
+    'maintenance_monthly',
+    'property_management_monthly_fees',
+    'utilities_monthly',
+    'advertising_monthly',
+    'other_expenses_monthly',
+]
+
+# Input fields read by calculate_metrics / calculate_metrics_batch
+INPUT_KEYS = [
+    'monthly_rent',
+    'additional_monthly_income',
+    'vacancy_rate',
+    *EXPENSE_KEYS,
+    'tax_rate',
+    'depreciation_anual',
+    'total_investment',
+    'property_value',
+    'appreciation_rate',
+]
+
+# Derived fields written by calculate_metrics, in the order they are computed
+METRIC_KEYS = [
+    'total_monthly_income',
+    'vacancy_loss',
+    'effective_monthly_income',
+    'total_monthly_expenses',
+    'annual_expenses',
+    'monthly_cash_flow',
+    'annual_cash_flow',
+    'noi',
+    'cap_rate',
+    'dscr',
+    'after_tax_cash_flow',
+    'cash_on_cash_return',
+    'annualized_return',
+]
+
+
+# Dependency graph of the derived metrics: name -> (fields it reads, formula).
+# Formulas mirror calculate_metrics and work on scalars or NumPy arrays; the
+# entries are listed in topological order (every metric after its inputs).
+METRIC_GRAPH = {
+    'total_monthly_income': (['monthly_rent', 'additional_monthly_income'],
+                             lambda v: v['monthly_rent'] + v['additional_monthly_income']),
+    'vacancy_loss': (['total_monthly_income', 'vacancy_rate'],
+                     lambda v: v['total_monthly_income'] * v['vacancy_rate']),
+    'effective_monthly_income': (['total_monthly_income', 'vacancy_loss'],
+                                 lambda v: v['total_monthly_income'] - v['vacancy_loss']),
+    'total_monthly_expenses': (EXPENSE_KEYS,
+                               lambda v: sum(v[key] for key in EXPENSE_KEYS)),
+    'annual_expenses': (['total_monthly_expenses', 'mortgage_monthly_payment'],
+                        lambda v: (v['total_monthly_expenses'] - v['mortgage_monthly_payment']) * 12),
+    'monthly_cash_flow': (['effective_monthly_income', 'total_monthly_expenses'],
+                          lambda v: v['effective_monthly_income'] - v['total_monthly_expenses']),
+    'annual_cash_flow': (['monthly_cash_flow'],
+                         lambda v: v['monthly_cash_flow'] * 12),
+    'noi': (['monthly_rent', 'annual_expenses'],
+            lambda v: (v['monthly_rent'] * 12) - v['annual_expenses']),
+    'cap_rate': (['noi', 'property_value'],
+                 lambda v: (v['noi'] / v['property_value']) * 100),
+    'dscr': (['noi', 'mortgage_monthly_payment'],
+             lambda v: v['noi'] / (v['mortgage_monthly_payment'] * 12)),
+    'after_tax_cash_flow': (['annual_cash_flow', 'noi', 'depreciation_anual', 'tax_rate'],
+                            lambda v: v['annual_cash_flow'] - (v['noi'] - v['depreciation_anual']) * v['tax_rate']),
+    'cash_on_cash_return': (['after_tax_cash_flow', 'total_investment'],
+                            lambda v: (v['after_tax_cash_flow'] / v['total_investment']) * 100),
+    'annualized_return': (['after_tax_cash_flow', 'property_value', 'appreciation_rate', 'total_investment'],
+                          lambda v: ((v['after_tax_cash_flow'] + (v['property_value'] * v['appreciation_rate'])) /
+                                     v['total_investment']) * 100),
 }
 
 
+# Metrics compared against market averages: (label, metric key); appreciation is shown in percent
+MARKET_COMPARISONS = [
+    ('Cash_on_Cash Return', 'cash_on_cash_return'),
+    ('Cap Rate', 'cap_rate'),
+    ('Appreciation Rate', 'appreciation_rate'),
+    ('Annualized Return', 'annualized_return'),
+]
+
+
+def affected_metrics(changed_keys):
+    """Metrics that (transitively) depend on any of changed_keys, in evaluation order."""
+    dirty = set(changed_keys)
+    affected = []
+    for metric, (inputs, _) in METRIC_GRAPH.items():
+        if not dirty.isdisjoint(inputs):
+            dirty.add(metric)
+            affected.append(metric)
+    return affected
+
+
+def _value_changed(old, new):
+    # Comparing whole columns costs as much as recomputing them, so arrays always count as changed
+    if isinstance(old, np.ndarray) or isinstance(new, np.ndarray):
+        return True
+    return old != new and not (old != old and new != new)  # NaN == NaN here
+
+
+def compute_metric_arrays(columns):
+    """Column-wise version of calculate_metrics.
+
+    Takes a mapping of INPUT_KEYS to scalars or NumPy arrays (anything that
+    broadcasts together) and returns a dict of METRIC_KEYS to float arrays.
+    Divisions by zero produce inf/NaN instead of raising.
+    """
+    values = {key: np.asarray(columns[key], dtype=np.float64) for key in INPUT_KEYS}
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for metric, (_, formula) in METRIC_GRAPH.items():
+            values[metric] = formula(values)
+
+    return {metric: values[metric] for metric in METRIC_KEYS}
+
+
+def _goal_seek_closed_form(c, target_metric, target_value, solve_for):
+    """Exact inverse of the linear metric formulas, or None when there isn't one."""
+    total_expenses = sum(c[key] for key in EXPENSE_KEYS)
+    annual_expenses = (total_expenses - c['mortgage_monthly_payment']) * 12
+
+    if solve_for == 'property_value' and target_metric == 'cap_rate':
+        noi = c['monthly_rent'] * 12 - annual_expenses
+        return noi * 100 / target_value
+
+    if solve_for == 'monthly_rent':
+        if target_metric == 'cap_rate':
+            return (target_value * c['property_value'] / 100 + annual_expenses) / 12
+        if target_metric == 'dscr':
+            return (target_value * c['mortgage_monthly_payment'] * 12 + annual_expenses) / 12
+        if target_metric == 'cash_on_cash_return':
+            # after_tax_cash_flow = rent * 12 * (1 - vacancy - tax) + terms independent of rent
+            occupancy = 1 - c['vacancy_rate']
+            needed = target_value * c['total_investment'] / 100
+            fixed = (12 * c['additional_monthly_income'] * occupancy - 12 * total_expenses +
+                     c['tax_rate'] * (annual_expenses + c['depreciation_anual']))
+            return (needed - fixed) / (12 * (occupancy - c['tax_rate']))
+
+    return None
+
+
 class RentalPropertyCalculator:
-    def __init__(self):
+    def __init__(self, market_index=None):
         # Default market averages (can be overridden by user input)
         self.market_average_cash_on_cash_return = 8
         self.market_average_cap_rate = 6
         self.market_average_appreciation_rate = 3  # 3%
         self.market_average_annualized_return = 10  # Or get this from user input
 
+        # Optional market_benchmarks.MarketBenchmarkIndex with regional averages
+        self.market_index = market_index
+
         # Dictionary to store property data
         self.property_data = {}
 
+    @timed('calculator_seconds', operation='calculate_metrics')
     def calculate_metrics(self, property_data: dict):
         """Performs all the calculations based on the property_data."""
 
@@ -98,30 +249,213 @@ class RentalPropertyCalculator:
                                               property_data['total_investment']) * 100
         return property_data
 
+    @timed('calculator_seconds', operation='calculate_metrics_batch')
+    def calculate_metrics_batch(self, properties):
+        """Vectorized calculate_metrics over many properties at once.
+
+        `properties` is either a pandas DataFrame with one row per property or a
+        dict of equal-length NumPy columns keyed like property_data_sample.
+        Returns the same kind of object with the derived metric columns added;
+        the input is not modified. Zero denominators (e.g. no mortgage -> dscr)
+        come back as inf/NaN rather than raising ZeroDivisionError.
+        """
+        # pandas is only imported by callers that pass DataFrames, so don't pay for it here
+        pd = sys.modules.get('pandas')
+        if pd is not None and isinstance(properties, pd.DataFrame):
+            metrics = compute_metric_arrays({key: properties[key].to_numpy() for key in INPUT_KEYS})
+            return properties.assign(**metrics)
+
+        metrics = compute_metric_arrays(properties)
+        result = dict(properties)
+        result.update(metrics)
+        return result
+
+    @timed('calculator_seconds', operation='update_metrics')
+    def update_metrics(self, property_data, changed_keys):
+        """Recomputes only the metrics downstream of changed_keys.
+
+        property_data must already hold every metric (e.g. from calculate_metrics);
+        it may be a dict of scalars, a dict of NumPy columns or a PropertyTable.
+        For scalar values propagation stops at metrics that didn't actually
+        change; array columns are always propagated. Zero denominators give
+        inf/NaN like calculate_metrics_batch, for scalars too. Returns the set
+        of metric names that were rewritten with a new value.
+        """
+        dirty = set(changed_keys)
+        changed = set()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for metric, (inputs, formula) in METRIC_GRAPH.items():
+                if dirty.isdisjoint(inputs):
+                    continue
+                try:
+                    new_value = formula(property_data)
+                except ZeroDivisionError:
+                    # Plain floats raise where NumPy gives inf/NaN (e.g. dscr without a mortgage)
+                    new_value = float(formula({key: np.float64(property_data[key]) for key in inputs}))
+                if metric not in property_data or _value_changed(property_data[metric], new_value):
+                    property_data[metric] = new_value
+                    dirty.add(metric)
+                    changed.add(metric)
+        return changed
+
+    def update_inputs(self, property_data, updates: dict):
+        """Applies input edits to an already calculated property_data and refreshes what depends on them.
+
+        Returns the set of metric names whose values changed.
+        """
+        changed_inputs = []
+        for key, value in updates.items():
+            if key not in property_data or _value_changed(property_data[key], value):
+                property_data[key] = value
+                changed_inputs.append(key)
+        return self.update_metrics(property_data, changed_inputs)
+
+    def sensitivity_grid(self, property_data: dict, grid: dict,
+                         metrics=('monthly_cash_flow', 'cap_rate', 'dscr', 'cash_on_cash_return')):
+        """Evaluates metrics over every combination of the values in `grid`.
+
+        `grid` maps input keys to the values to try, e.g.
+        {'monthly_rent': [...], 'property_value': [...]}. Each key is laid on its
+        own array axis and the whole grid is computed in one broadcast pass.
+        Returns a DataFrame indexed by the grid values (one level per key).
+        """
+        import pandas as pd
+
+        keys = list(grid)
+        columns = {key: property_data[key] for key in INPUT_KEYS}
+        for axis, key in enumerate(keys):
+            shape = [1] * len(keys)
+            shape[axis] = -1
+            columns[key] = np.asarray(grid[key], dtype=np.float64).reshape(shape)
+
+        results = compute_metric_arrays(columns)
+        shape = tuple(len(grid[key]) for key in keys)
+        index = pd.MultiIndex.from_product([list(grid[key]) for key in keys], names=keys)
+        return pd.DataFrame({metric: np.broadcast_to(results[metric], shape).ravel() for metric in metrics},
+                            index=index)
+
+    def goal_seek(self, properties, target_metric: str, target_value: float, solve_for='property_value',
+                  bounds=None, tol=1e-6, max_iter=200):
+        """Finds the value of `solve_for` at which `target_metric` equals `target_value`.
+
+        For the usual questions (maximum property_value for a cap_rate, minimum
+        monthly_rent for a cap_rate, dscr or cash_on_cash_return) the answer is
+        closed form. Any other pairing is solved by bisection over `bounds`
+        (default 0 to 10x the current value), run on every property at once.
+        Accepts a single property dict (returns a float) or a DataFrame / dict
+        of columns (returns an array). Properties whose metric cannot reach the
+        target inside the bounds get NaN.
+        """
+        single = isinstance(properties, dict) and np.ndim(properties.get('monthly_rent')) == 0
+        pd = sys.modules.get('pandas')
+        if pd is not None and isinstance(properties, pd.DataFrame):
+            columns = {key: properties[key].to_numpy(dtype=np.float64) for key in INPUT_KEYS}
+        else:
+            columns = {key: np.atleast_1d(np.asarray(properties[key], dtype=np.float64)) for key in INPUT_KEYS}
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            solution = _goal_seek_closed_form(columns, target_metric, target_value, solve_for)
+        if solution is None:
+            solution = self._bisect(columns, target_metric, target_value, solve_for, bounds, tol, max_iter)
+        solution = np.where(np.isfinite(solution), solution, np.nan)
+        return float(solution[0]) if single else solution
+
+    @staticmethod
+    def _bisect(columns, target_metric, target_value, solve_for, bounds, tol, max_iter):
+        """Vectorized bisection on target_metric - target_value over the solve_for column."""
+        current = columns[solve_for]
+        if bounds is None:
+            lo = np.zeros_like(current)
+            hi = np.maximum(np.abs(current) * 10, 1.0)
+        else:
+            lo = np.full_like(current, bounds[0])
+            hi = np.full_like(current, bounds[1])
+
+        def gap(x):
+            return compute_metric_arrays({**columns, solve_for: x})[target_metric] - target_value
+
+        gap_lo = gap(lo)
+        valid = np.sign(gap_lo) != np.sign(gap(hi))
+        for _ in range(max_iter):
+            mid = (lo + hi) / 2
+            gap_mid = gap(mid)
+            same_side = np.sign(gap_mid) == np.sign(gap_lo)
+            lo = np.where(same_side, mid, lo)
+            gap_lo = np.where(same_side, gap_mid, gap_lo)
+            hi = np.where(same_side, hi, mid)
+            if np.all(hi - lo < tol):
+                break
+        return np.where(valid, (lo + hi) / 2, np.nan)
+
+    def market_averages(self):
+        """The national default market averages, keyed like the metrics they benchmark."""
+        return {key: getattr(self, f'market_average_{key}') for _, key in MARKET_COMPARISONS}
+
+    @timed('calculator_seconds', operation='compare_with_market')
     def compare_with_market(self, property_data: dict):
-        """Compares calculated metrics with market averages and prints the results."""
+        """Compares calculated metrics with market averages.
 
-        print("\nComparison with Market Averages:")
+        Uses the regional averages from market_index when the property has a
+        zip_code/county/metro/state the index knows, and the national defaults
+        otherwise. Returns one dict per compared metric.
+        """
+        averages, region_level, region = self.market_averages(), 'national', None
+        if self.market_index is not None:
+            found, region_level, region = self.market_index.lookup(property_data)
+            # Metrics the dataset has no value for keep the defaults, as in compare_with_market_batch
+            averages.update((key, value) for key, value in found.items() if value == value)
 
-        for metric, value in [
-            ('Cash_on_Cash Return', property_data['cash_on_cash_return']),
-            ('Cap Rate', property_data['cap_rate']),
-            ('Appreciation Rate', property_data['appreciation_rate'] * 100),
-            ('Annualized Return', property_data['annualized_return'])
-        ]:
-            if metric == 'Cash_on_Cash Return':
-                market_average = self.market_average_cash_on_cash_return
-            else:
-                market_average = getattr(self, f'market_average_{metric.lower().replace(" ", "_")}')
+        comparisons = []
+        for metric, key in MARKET_COMPARISONS:
+            value = property_data[key] * 100 if key == 'appreciation_rate' else property_data[key]
+            market_average = averages[key]
+            comparisons.append({
+                'metric': metric,
+                'key': key,
+                'value': value,
+                'market_average': market_average,
+                'above_average': bool(value > market_average),
+                'region_level': region_level,
+                'region': region,
+            })
+        return comparisons
 
-            if value > market_average:
-                print(f"  - {metric} ({value:.2f}%) is ABOVE average ({market_average:.2f}%).")
-            else:
-                print(f"  - {metric} ({value:.2f}%) is BELOW average ({market_average:.2f}%).")
-            if metric == 'Annualized Return':
-                market_average = self.market_average_cash_on_cash_return  # Using CoC return as benchmark
-            else:
-                market_average = getattr(self, f'market_average_{metric.lower().replace(" ", "_")}')
+    @timed('calculator_seconds', operation='compare_with_market_batch')
+    def compare_with_market_batch(self, properties):
+        """Vectorized compare_with_market over a DataFrame of calculated properties.
+
+        Regional averages are resolved for the whole batch with one indexed join
+        per region level. Returns a DataFrame aligned with `properties` holding
+        `<metric>_market_average` and `<metric>_above_average` columns plus the
+        matched `region_level` and `region`.
+        """
+        import pandas as pd
+
+        if self.market_index is not None:
+            # Regions missing a metric (and datasets without a national row) fall back to the defaults
+            averages = self.market_index.lookup_batch(properties).fillna(self.market_averages())
+        else:
+            averages = pd.DataFrame(self.market_averages(), index=properties.index)
+            averages['region_level'] = 'national'
+            averages['region'] = None
+
+        result = pd.DataFrame(index=properties.index)
+        for _, key in MARKET_COMPARISONS:
+            values = properties[key] * 100 if key == 'appreciation_rate' else properties[key]
+            result[f'{key}_market_average'] = averages[key]
+            result[f'{key}_above_average'] = values > averages[key]
+        result['region_level'] = averages['region_level']
+        result['region'] = averages['region']
+        return result
+
+    def display_comparison(self, comparisons):
+        """Prints the results of compare_with_market."""
+
+        print("\nComparison with Market Averages:")
+        for comparison in comparisons:
+            position = 'ABOVE' if comparison['above_average'] else 'BELOW'
+            print(f"  - {comparison['metric']} ({comparison['value']:.2f}%) is {position} average "
+                  f"({comparison['market_average']:.2f}%).")
 
     def display_results(self, property_data: dict):
         """Prints all the calculated metrics and the comparison with market averages."""
@@ -0,0 +1,204 @@
+import marshal
+import secrets
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+from property_record import PROPERTY_FIELDS
+
+_FIELD_INDEX = {key: i for i, key in enumerate(PROPERTY_FIELDS)}
+_MASKS = struct.Struct('<QQ')
+
+
+def pack_property_data(property_data):
+    """Packs a property_data dict into a fixed binary layout, or returns None if it doesn't fit.
+
+    Layout: a bitmask of the fields present, a bitmask of the fields that are
+    None, then one float64 per remaining field in PROPERTY_FIELDS order.
+    Dicts with unknown keys or non-numeric values aren't packable.
+    """
+    present = none = 0
+    values = []
+    for key in PROPERTY_FIELDS:
+        if key not in property_data:
+            continue
+        value = property_data[key]
+        bit = 1 << _FIELD_INDEX[key]
+        present |= bit
+        if value is None:
+            none |= bit
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values.append(float(value))
+        else:
+            return None
+    if len(property_data) != bin(present).count('1'):
+        return None
+    return _MASKS.pack(present, none) + struct.pack(f'<{len(values)}d', *values)
+
+
+def unpack_property_data(packed):
+    present, none = _MASKS.unpack_from(packed)
+    keys = [key for i, key in enumerate(PROPERTY_FIELDS) if present >> i & 1 and not none >> i & 1]
+    values = struct.unpack_from(f'<{len(keys)}d', packed, _MASKS.size)
+    property_data = {}
+    value_iter = iter(values)
+    for i, key in enumerate(PROPERTY_FIELDS):
+        if present >> i & 1:
+            property_data[key] = None if none >> i & 1 else next(value_iter)
+    return property_data
+
+
+def encode_session(data):
+    """Compact binary form of a session dict; property_data uses the packed layout when it can."""
+    payload = dict(data)
+    property_data = payload.get('property_data')
+    if isinstance(property_data, dict):
+        packed = pack_property_data(property_data)
+        if packed is not None:
+            del payload['property_data']
+            payload['__packed_property_data'] = packed
+    return marshal.dumps(payload)
+
+
+def decode_session(blob):
+    payload = marshal.loads(blob)
+    packed = payload.pop('__packed_property_data', None)
+    if packed is not None:
+        payload['property_data'] = unpack_property_data(packed)
+    return payload
+
+
+class MemorySessionStore:
+    """In-process LRU of encoded sessions with a time-to-live (single worker)."""
+
+    def __init__(self, max_entries=10000, ttl=24 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, sid):
+        with self.lock:
+            entry = self.entries.get(sid)
+            if entry is None:
+                return None
+            expires, blob = entry
+            if expires < time.time():
+                del self.entries[sid]
+                return None
+            self.entries.move_to_end(sid)
+            return blob
+
+    def set(self, sid, blob):
+        with self.lock:
+            self.entries[sid] = (time.time() + self.ttl, blob)
+            self.entries.move_to_end(sid)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, sid):
+        with self.lock:
+            self.entries.pop(sid, None)
+
+
+class SQLiteSessionStore:
+    """SQLite-backed session store that several worker processes can share."""
+
+    def __init__(self, path='sessions.sqlite3', ttl=24 * 3600, purge_every=1000):
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self.writes = 0
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS sessions (sid TEXT PRIMARY KEY, data BLOB NOT NULL, "
+                        "expires REAL NOT NULL)")
+        self.db.commit()
+
+    def get(self, sid):
+        with self.lock:
+            row = self.db.execute("SELECT data FROM sessions WHERE sid = ? AND expires >= ?",
+                                  (sid, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, sid, blob):
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO sessions (sid, data, expires) VALUES (?, ?, ?)",
+                            (sid, blob, time.time() + self.ttl))
+            self.writes += 1
+            if self.writes % self.purge_every == 0:
+                self.db.execute("DELETE FROM sessions WHERE expires < ?", (time.time(),))
+            self.db.commit()
+
+    def delete(self, sid):
+        with self.lock:
+            self.db.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+            self.db.commit()
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Session dict that remembers its id and whether it changed during the request."""
+
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+
+        CallbackDict.__init__(self, initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Keeps session data in a server-side store; the cookie carries only a random session id.
+
+    Sessions are written back only when they changed, so requests that just
+    read the session (e.g. a follow-up agent question) skip encoding and
+    storage entirely and reuse the metrics already computed for the property.
+    """
+
+    def __init__(self, store=None):
+        self.store = store if store is not None else MemorySessionStore()
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            blob = self.store.get(sid)
+            if blob is not None:
+                return ServerSession(decode_session(blob), sid=sid)
+        return ServerSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if session.modified or session.new:
+            self.store.set(session.sid, encode_session(dict(session)))
+        if session.new:
+            response.set_cookie(name, session.sid, httponly=self.get_cookie_httponly(app), domain=domain, path=path,
+                                secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app),
+                                expires=self.get_expiration_time(app, session))
+
+
+def session_interface_from_env(environ):
+    """Builds the session interface selected by SESSION_BACKEND ('memory' or 'sqlite')."""
+    backend = environ.get("SESSION_BACKEND", "memory")
+    ttl = float(environ.get("SESSION_TTL", 24 * 3600))
+    if backend == "sqlite":
+        return ServerSideSessionInterface(SQLiteSessionStore(environ.get("SESSION_SQLITE_PATH", "sessions.sqlite3"),
+                                                             ttl=ttl))
+    if backend == "memory":
+        return ServerSideSessionInterface(MemorySessionStore(ttl=ttl))
+    raise ValueError(f"Unknown SESSION_BACKEND '{backend}'")
@@ -0,0 +1,128 @@
+import pytest
+
+from chat_session import AgentChatSession
+from fake_gemini import FakeGenerativeModel, count_tokens, prompt_text
+from real_estate_agent import build_agent_prompt, response_cache
+from real_estate_calculator import RentalPropertyCalculator, property_data_sample
+
+QUESTIONS = ["What is the monthly cash flow?", "Is the cap rate good?", "Should I refinance?"]
+
+
+def analyzed_property():
+    property_data = dict(property_data_sample)
+    RentalPropertyCalculator().calculate_metrics(property_data)
+    return property_data
+
+
+def test_prompts_stay_below_the_stateless_prompt():
+    model = FakeGenerativeModel(first_token_latency=0, chunk_latency=0)
+    chat = AgentChatSession(model=model, use_cache=False)
+    property_data = analyzed_property()
+    calculator = RentalPropertyCalculator()
+    stateless_total = 0
+
+    for turn in range(30):
+        if turn == 15:
+            calculator.update_inputs(property_data, {'monthly_rent': property_data['monthly_rent'] * 1.1})
+        question = QUESTIONS[turn % len(QUESTIONS)]
+        chat.ask(question, property_data)
+        stateless = count_tokens(prompt_text(build_agent_prompt(question, property_data)))
+        assert chat.turns[-1]['prompt_tokens'] < stateless
+        stateless_total += stateless
+
+    # Summaries included, the conversation costs less than answering every question statelessly
+    assert any(turn['kind'] == 'summary' for turn in chat.turns)
+    assert sum(model.prompt_tokens) < stateless_total
+
+
+def test_edits_are_sent_as_deltas():
+    model = FakeGenerativeModel(first_token_latency=0, chunk_latency=0)
+    chat = AgentChatSession(model=model, token_budget=10 ** 6, use_cache=False)
+    property_data = analyzed_property()
+    chat.ask("What is the monthly cash flow?", property_data)
+    RentalPropertyCalculator().update_inputs(property_data, {'monthly_rent': 3000})
+    chat.ask("And now?", property_data)
+    assert chat.history[-2]['parts'][0].startswith("Property updated: monthly_rent=3000")
+
+
+class FailingOnce(FakeGenerativeModel):
+    """Raises on the next call after fail() is called, like a timed-out request."""
+
+    failing = False
+    sent = None
+
+    def fail(self):
+        self.failing = True
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.sent = prompt
+        if self.failing:
+            self.failing = False
+            raise TimeoutError("deadline exceeded")
+        return super().generate_content(prompt, stream=stream, **kwargs)
+
+
+def sent_text(contents):
+    return '\n'.join(part for message in contents for part in message['parts'])
+
+
+def test_edit_survives_a_failed_turn():
+    model = FailingOnce(first_token_latency=0, chunk_latency=0)
+    chat = AgentChatSession(model=model, token_budget=10 ** 6, use_cache=False)
+    property_data = analyzed_property()
+    chat.ask("What is the monthly cash flow?", property_data)
+    RentalPropertyCalculator().update_inputs(property_data, {'monthly_rent': 3500})
+
+    model.fail()
+    with pytest.raises(TimeoutError):
+        chat.ask("And now?", property_data)
+    chat.ask("And now?", property_data)
+    assert "monthly_rent=3500" in model.sent[-1]['parts'][0]
+    assert "3500" in sent_text(chat.pinned + chat.history)
+
+
+def test_edit_survives_a_closed_stream():
+    model = FailingOnce(first_token_latency=0, chunk_latency=0)
+    chat = AgentChatSession(model=model, token_budget=10 ** 6, use_cache=False)
+    property_data = analyzed_property()
+    chat.ask("What is the monthly cash flow?", property_data)
+    RentalPropertyCalculator().update_inputs(property_data, {'monthly_rent': 3500})
+
+    stream = chat.stream("And now?", property_data)
+    next(stream)
+    stream.close()  # the client disconnected
+    chat.ask("And now?", property_data)
+    assert "monthly_rent=3500" in model.sent[-1]['parts'][0]
+
+
+def test_failed_summary_keeps_the_history():
+    model = FailingOnce(first_token_latency=0, chunk_latency=0)
+    chat = AgentChatSession(model=model, token_budget=10 ** 6, use_cache=False)
+    property_data = analyzed_property()
+    chat.ask("What is the monthly cash flow?", property_data)
+    history = list(chat.history)
+
+    chat.token_budget = 1  # the next question has to be summarized first
+    model.fail()
+    with pytest.raises(TimeoutError):
+        chat.ask("Is the cap rate good?", property_data)
+    assert chat.history == history and chat.summary is None
+
+    chat.ask("Is the cap rate good?", property_data)
+    assert chat.summary and chat.turns[-2]['kind'] == 'summary'
+
+
+def test_first_question_is_answered_from_the_response_cache():
+    response_cache.clear()
+    model = FakeGenerativeModel(first_token_latency=0, chunk_latency=0)
+    property_data = analyzed_property()
+    first = AgentChatSession(model=model).ask("Is the cap rate good?", property_data)
+
+    chat = AgentChatSession(model=model)
+    assert ''.join(chat.stream("Is the cap rate good?", property_data)) == first
+    assert chat.turns == [{'kind': 'cached', 'prompt_tokens': 0}]
+    assert model.calls == 1
+
+    # Follow-ups depend on the conversation, so they always go to the model
+    chat.ask("Is the cap rate good?", property_data)
+    assert model.calls == 2
@@ -0,0 +1,84 @@
+import math
+
+import numpy as np
+import pytest
+
+from real_estate_calculator import (INPUT_KEYS, METRIC_KEYS, RentalPropertyCalculator, compute_metric_arrays,
+                                    property_data_sample)
+
+
+def scalar_property():
+    property_data = dict(property_data_sample)
+    RentalPropertyCalculator().calculate_metrics(property_data)
+    return property_data
+
+
+def column_properties(count=500, seed=0):
+    rng = np.random.default_rng(seed)
+    columns = {key: rng.uniform(0, 1, count) if key.endswith('_rate') else rng.uniform(0, 5000, count)
+               for key in INPUT_KEYS}
+    # A slice without a mortgage exercises the inf/NaN paths
+    columns['mortgage_monthly_payment'][::50] = 0
+    columns.update(compute_metric_arrays(columns))
+    return columns
+
+
+def assert_matches_full_recompute(property_data):
+    expected = compute_metric_arrays(property_data)
+    for metric in METRIC_KEYS:
+        actual = np.asarray(property_data[metric], dtype=np.float64)
+        assert np.allclose(actual, expected[metric], rtol=1e-12, atol=0, equal_nan=True), metric
+
+
+@pytest.mark.parametrize('key', INPUT_KEYS)
+def test_scalar_edit_matches_full_recompute(key):
+    property_data = scalar_property()
+    RentalPropertyCalculator().update_inputs(property_data, {key: property_data[key] * 1.1 + 1})
+    assert_matches_full_recompute(property_data)
+
+
+@pytest.mark.parametrize('key', INPUT_KEYS)
+def test_column_edit_matches_full_recompute(key):
+    columns = column_properties()
+    edit = columns[key] * np.random.default_rng(1).uniform(0.9, 1.1, len(columns[key]))
+    RentalPropertyCalculator().update_inputs(columns, {key: edit})
+    assert_matches_full_recompute(columns)
+
+
+def test_unchanged_scalar_edit_rewrites_nothing():
+    property_data = scalar_property()
+    assert RentalPropertyCalculator().update_inputs(property_data, {'monthly_rent': property_data['monthly_rent']}) == set()
+
+
+def test_scalar_mortgage_edited_to_zero():
+    property_data = scalar_property()
+    changed = RentalPropertyCalculator().update_inputs(property_data, {'mortgage_monthly_payment': 0})
+    assert 'dscr' in changed
+    assert math.isinf(property_data['dscr'])
+    assert_matches_full_recompute(property_data)
+
+
+def test_column_mortgage_edited_to_zero():
+    columns = column_properties()
+    RentalPropertyCalculator().update_inputs(columns, {'mortgage_monthly_payment': np.zeros(len(columns['noi']))})
+    assert np.isinf(columns['dscr']).all()
+    assert_matches_full_recompute(columns)
+
+
+def test_form_edit_to_zero_mortgage():
+    from app import app
+
+    form = {key.replace('_', ' '): str(value) for key, value in {
+        'monthly_rent': 2800, 'additional_monthly_income': 0, 'vacancy_rate': 5, 'mortgage_monthly_payment': 1500,
+        'property_monthly_taxes': 250, 'insurance_monthly': 150, 'hoa_fees_monthly': 50, 'maintenance_monthly': 150,
+        'property_management_monthly_fees': 0, 'utilities_monthly': 0, 'advertising_monthly': 0,
+        'other_expenses_monthly': 0, 'capex_annual': 1000, 'tax_rate': 25, 'depreciation_anual': 0,
+        'total_investment': 50000, 'property_value': 300000, 'appreciation_rate': 3,
+    }.items()}
+    client = app.test_client()
+    assert client.post('/', data=form).status_code == 200
+    form['mortgage monthly payment'] = '0'
+    response = client.post('/', data=form)
+    assert response.status_code == 200
+    # The session, now holding an infinite dscr, still loads
+    assert client.get('/').status_code == 200
@@ -0,0 +1,35 @@
+import pytest
+
+import instrumentation
+
+
+@pytest.fixture
+def metrics():
+    was_enabled = instrumentation.is_enabled()
+    instrumentation.enable()
+    instrumentation.reset()
+    yield instrumentation
+    instrumentation.reset()
+    if not was_enabled:
+        instrumentation.disable()
+
+
+def test_render_mixed_label_types(metrics):
+    metrics.increment('attom_requests_total', outcome=200)
+    metrics.increment('attom_requests_total', outcome='ConnectionError')
+    metrics.increment('attom_requests_total', outcome=200)
+    metrics.observe('http_request_seconds', 0.01, status=200)
+    metrics.observe('http_request_seconds', 0.02, status='error')
+
+    text = metrics.render_prometheus()
+
+    assert 'attom_requests_total{outcome="200"} 2' in text
+    assert 'attom_requests_total{outcome="ConnectionError"} 1' in text
+    assert 'http_request_seconds_count{status="200"} 1' in text
+    assert 'http_request_seconds_count{status="error"} 1' in text
+
+
+def test_disabled_records_nothing(metrics):
+    metrics.disable()
+    metrics.increment('attom_requests_total', outcome=200)
+    assert metrics.snapshot() == ({}, {})
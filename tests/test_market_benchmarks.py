@@ -0,0 +1,21 @@
+import pandas as pd
+
+from market_benchmarks import MarketBenchmarkIndex
+from real_estate_calculator import RentalPropertyCalculator, property_data_sample
+
+
+def test_missing_regional_metric_falls_back_like_the_batch_path(tmp_path):
+    path = tmp_path / 'benchmarks.csv'
+    path.write_text("level,region,cash_on_cash_return,cap_rate,appreciation_rate,annualized_return\n"
+                    "zip,10001,9,,4,12\n"
+                    "national,,7,6,,10\n")
+    calculator = RentalPropertyCalculator(MarketBenchmarkIndex(str(path)))
+    property_data = dict(property_data_sample, zip_code='10001')
+    calculator.calculate_metrics(property_data)
+
+    scalar = {comparison['key']: comparison['market_average'] for comparison in calculator.compare_with_market(property_data)}
+    batch = calculator.compare_with_market_batch(pd.DataFrame([property_data])).iloc[0]
+
+    assert scalar['cap_rate'] == 6.0  # from the national row
+    for key, average in scalar.items():
+        assert batch[f'{key}_market_average'] == average